@@ -56,5 +56,16 @@ except ImportError:
     Token.Results.OddRow = None
     Token.Results.EvenRow = None
 
+try:
+    from wcwidth import wcswidth, wcwidth
+except ImportError:
+    wcswidth = None
+    wcwidth = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 float_types = (float, Decimal)
@@ -0,0 +1,452 @@
+# -*- coding: utf-8 -*-
+"""A streaming renderer for tabulate's aligned table formats.
+
+The renderer lays out the columns the way :func:`tabulate.tabulate` does,
+but yields the table one line at a time instead of building it as one
+string. The column layout is computed from the data first; then each row
+is formatted, padded and joined only when its line is needed.
+
+A layout can also be computed from a sample of the rows and then fixed
+(see :func:`fix_layout`): the rows after the sample are rendered as they
+are read, and cells that do not fit are truncated (or, for numbers,
+replaced by :data:`OVERFLOW_MARK` marks).
+
+For tabulate's multiline formats, cells can span several lines. Each such
+cell is split (and its lines measured) once, the lines shown per cell can
+be capped, and the lines of a row are yielded one at a time.
+
+"""
+
+from __future__ import unicode_literals
+from collections import namedtuple
+from functools import lru_cache
+from itertools import zip_longest
+import re
+
+import tabulate
+
+from cli_helpers.utils import display_width, strip_ansi, truncate_string
+
+ColumnLayout = namedtuple(
+    "ColumnLayout",
+    "types float_formats aligns widths decimals has_invisible fixed multiline "
+    "max_lines",
+)
+
+# the narrowest column a truncated cell (with its ellipsis) fits in
+MIN_FIXED_WIDTH = 3
+
+# fills a number that is too wide for its fixed column
+OVERFLOW_MARK = "#"
+
+# replaces the lines of a cell beyond the maximum number of lines
+MORE_LINES_MARKER = "[+{} lines]"
+
+# splits a string into its text and (odd) escape sequences
+_escape_sequences = re.compile("(\033\\[(?:\\d|;)*[a-zA-Z])")
+
+# line boundaries (besides "\n") that tabulate splits multiline cells on
+_other_line_breaks = re.compile("[\v\f\x1c\x1d\x1e\x85\u2028\u2029]")
+
+_padfns = {
+    "left": tabulate._padright,
+    "right": tabulate._padleft,
+    "decimal": tabulate._padleft,
+    "center": tabulate._padboth,
+}
+
+
+def is_number(value):
+    """Check if the formatted cell *value* is a number (e.g. not a missing
+    value), so it can be aligned by its decimal point."""
+    if not isinstance(value, str):
+        return True
+    if "\x1b" in value:
+        value = tabulate._strip_ansi(value)
+    return tabulate._isnumber(value) or tabulate._isnumber_with_thousands_separator(
+        value
+    )
+
+
+def _prepare_cell(value, column_type, float_format, align, has_invisible, strip):
+    """Format a cell *value*.
+
+    :return: The formatted value and the number of symbols after its decimal
+             point (for decimal aligned columns, otherwise 0). Text in a
+             decimal aligned column has :data:`None` symbols after its
+             decimal point: it is right aligned as it is.
+
+    """
+    value = tabulate._format(value, column_type, float_format, "", "", has_invisible)
+    if align == "decimal":
+        if not is_number(value):
+            return value, None
+        if has_invisible:
+            return value, tabulate._afterpoint(tabulate._strip_ansi(value))
+        return value, tabulate._afterpoint(value)
+    if strip:
+        value = value.strip()
+    return value, 0
+
+
+def _is_plain_row(row, ncols):
+    return (
+        isinstance(row, (list, tuple))
+        and len(row) == ncols
+        and not tabulate._is_separating_line(row)
+    )
+
+
+def get_column_types(rows, headers, disable_numparse=False):
+    """Find the column types of *rows* like :func:`tabulate.tabulate` does.
+
+    :return: The column types, whether any cell contains ANSI escape
+             sequences, and whether any cell contains a newline; or
+             :data:`None` if only tabulate can handle the rows (e.g. rows
+             of different lengths).
+    :rtype: tuple
+
+    """
+    ncols = len(headers)
+    has_invisible = any("\x1b" in h and tabulate._ansi_codes.search(h) for h in headers)
+    has_newlines = False
+    types = ncols * [bool]
+    numparses = tabulate._expand_numparse(disable_numparse, ncols)
+    for row in rows:
+        if not _is_plain_row(row, ncols):
+            return None
+        for i, v in enumerate(row):
+            if isinstance(v, bytes):
+                return None
+            if isinstance(v, str):
+                if "\n" in v or "\r" in v:
+                    has_newlines = True
+                if "\x1b" in v and tabulate._ansi_codes.search(v):
+                    has_invisible = True
+            types[i] = tabulate._more_generic(
+                types[i], tabulate._type(v, True, numparses[i])
+            )
+    return types, has_invisible, has_newlines
+
+
+def get_layout(
+    rows,
+    headers,
+    numalign="decimal",
+    stralign="left",
+    colalign=None,
+    floatfmt=tabulate._DEFAULT_FLOATFMT,
+    disable_numparse=False,
+    preserve_whitespace=False,
+    multiline=False,
+    max_lines=None,
+):
+    """Lay out the columns of *rows* like :func:`tabulate.tabulate` does.
+
+    *rows* is read twice: once to find the column types, and once to
+    measure the formatted cells.
+
+    :param bool multiline: Whether cells may span several lines, as in
+                           tabulate's multiline formats.
+    :param int max_lines: The maximum number of lines shown per cell. The
+                          remaining lines are replaced by a
+                          :data:`MORE_LINES_MARKER` line.
+    :return: The :class:`ColumnLayout`, or :data:`None` if the table needs
+             a layout that only tabulate provides (e.g. multiline headers).
+
+    """
+    headers = [str(h) for h in headers]
+    ncols = len(headers)
+    if not (ncols and rows and tabulate.wcwidth and tabulate.WIDE_CHARS_MODE):
+        return None
+    if isinstance(colalign, str) or not isinstance(floatfmt, str):
+        return None
+    if any("\n" in h or "\r" in h for h in headers):
+        return None
+    column_types = get_column_types(rows, headers, disable_numparse)
+    if column_types is None:
+        return None
+    types, has_invisible, has_newlines = column_types
+    if has_newlines and not multiline:
+        return None
+    is_multiline = has_newlines
+
+    aligns = [numalign if t in (int, float) else stralign for t in types]
+    for i, align in enumerate(colalign or ()):
+        if i < ncols and align != "global":
+            aligns[i] = align
+    if any(align not in _padfns for align in aligns):
+        return None
+
+    width_fn = tabulate._visible_width if has_invisible else display_width
+    decimals = [-1 if align == "decimal" else 0 for align in aligns]
+    widths = [width_fn(h) + tabulate.MIN_PADDING for h in headers]
+    cell_widths = ncols * [0]
+    text_widths = ncols * [0]
+    float_formats = ncols * [floatfmt]
+    strip = not preserve_whitespace
+    for row in rows:
+        for i, v in enumerate(row):
+            v, decimal = _prepare_cell(
+                v, types[i], floatfmt, aligns[i], has_invisible, strip
+            )
+            if is_multiline and ("\r" in v or _other_line_breaks.search(v)):
+                return None
+            if "\n" in v:
+                if aligns[i] == "decimal":
+                    return None
+                width = max(w for _, w in _split_cell(v, has_invisible, max_lines))
+            else:
+                width = width_fn(v)
+            if decimal is None:
+                text_widths[i] = max(text_widths[i], width)
+                continue
+            cell_widths[i] = max(cell_widths[i], width - decimal)
+            if decimal > decimals[i]:
+                decimals[i] = decimal
+    widths = [
+        max(w, cw + d, tw)
+        for w, cw, d, tw in zip(widths, cell_widths, decimals, text_widths)
+    ]
+
+    return ColumnLayout(
+        types,
+        float_formats,
+        aligns,
+        widths,
+        decimals,
+        has_invisible,
+        False,
+        is_multiline,
+        max_lines,
+    )
+
+
+def fix_layout(layout, column_widths=None):
+    """Fix the column widths of *layout*, e.g. one computed from a sample.
+
+    Cells rendered with a fixed layout are truncated if they are wider than
+    their column; numbers are replaced by :data:`OVERFLOW_MARK` marks.
+
+    :param ColumnLayout layout: The column layout (see :func:`get_layout`).
+    :param iterable column_widths: The width of each column, or :data:`None`
+                                   to keep the width from *layout*.
+    :return: The fixed column layout.
+    :rtype: ColumnLayout
+
+    """
+    widths = [
+        max(w if cw is None else cw, MIN_FIXED_WIDTH)
+        for w, cw in zip_longest(layout.widths, column_widths or ())
+        if w is not None
+    ]
+    return layout._replace(widths=widths, fixed=True)
+
+
+def _split_cell(value, has_invisible, max_lines):
+    """Split the formatted cell *value* into its lines, with their widths.
+
+    The lines of short cells are cached; long cells are split each time, so
+    the cache never keeps them alive.
+
+    """
+    if len(value) > _max_cached_cell_length:
+        return _split_lines(value, has_invisible, max_lines)
+    return _cached_split_lines(value, has_invisible, max_lines)
+
+
+# the length of the longest cell whose lines are cached
+_max_cached_cell_length = 256
+
+
+def _split_lines(value, has_invisible, max_lines):
+    lines = value.split("\n")
+    if not lines[-1]:
+        lines.pop()
+    if max_lines and len(lines) > max_lines:
+        lines[max_lines:] = [MORE_LINES_MARKER.format(len(lines) - max_lines)]
+    width_fn = tabulate._visible_width if has_invisible else display_width
+    return tuple((line, width_fn(line)) for line in lines)
+
+
+_cached_split_lines = lru_cache(maxsize=4096)(_split_lines)
+
+
+def _fit_cell(value, width, number=False):
+    """Truncate the formatted cell *value* to *width* display columns.
+
+    Escape sequences take no space, and are all kept, so a style that is
+    opened or closed in the cell (e.g. a row style) still is. A *number*
+    that does not fit is not cut short, which would show a wrong value:
+    it is replaced by :data:`OVERFLOW_MARK` marks instead.
+
+    """
+    if "\x1b" not in value:
+        value = value.rstrip(" ")
+        if number and display_width(value) > width:
+            return OVERFLOW_MARK * width
+        return truncate_string(value, width, skip_multiline_string=False)
+    text = strip_ansi(value).rstrip(" ")
+    fitted = truncate_string(text, width, skip_multiline_string=False)
+    ellipsis = fitted[len(text) :] if fitted == text else fitted[-3:]
+    keep = len(fitted) - len(ellipsis)
+    if number and fitted != text:
+        ellipsis, keep = OVERFLOW_MARK * width, 0
+    parts = _escape_sequences.split(value)
+    for i in range(0, len(parts), 2):
+        part = parts[i][:keep]
+        keep -= len(part)
+        if ellipsis and len(part) < len(parts[i]):
+            part += ellipsis
+            ellipsis = ""
+        parts[i] = part
+    return "".join(parts)
+
+
+def _build_line(widths, padding, line, aligns=()):
+    if callable(line):
+        # e.g. the line of the pipe format, with colons for the alignments
+        return line([w + 2 * padding for w in widths], aligns)
+    begin, fill, sep, end = line
+    return (begin + sep.join(fill * (w + 2 * padding) for w in widths) + end).rstrip()
+
+
+def _build_row(cells, padding, row):
+    begin, sep, end = row
+    pad = " " * padding
+    return (begin + pad + (pad + sep + pad).join(cells) + pad + end).rstrip()
+
+
+def format_row(row, layout, preserve_whitespace=False):
+    """Format and pad the cells of *row* to the widths in *layout*."""
+    strip = not preserve_whitespace
+    width_fn = tabulate._visible_width if layout.has_invisible else display_width
+    cells = []
+    for v, t, ff, align, width, maxdecimal in zip(
+        row,
+        layout.types,
+        layout.float_formats,
+        layout.aligns,
+        layout.widths,
+        layout.decimals,
+    ):
+        v, decimal = _prepare_cell(v, t, ff, align, layout.has_invisible, strip)
+        if align == "decimal" and decimal is not None:
+            v += (maxdecimal - decimal) * " "
+        if layout.fixed and width_fn(v) > width:
+            number = (t in (int, float) or align == "decimal") and is_number(v)
+            v = _fit_cell(v, width, number)
+        cells.append(_padfns[align](width - (width_fn(v) - len(v)), v))
+    return cells
+
+
+def format_multiline_row(row, layout, preserve_whitespace=False):
+    """Format and pad the cells of *row*, which may span several lines.
+
+    :return: The padded lines of each cell.
+    :rtype: list
+
+    """
+    strip = not preserve_whitespace
+    width_fn = tabulate._visible_width if layout.has_invisible else display_width
+    cells = []
+    for v, t, ff, align, width, maxdecimal in zip(
+        row,
+        layout.types,
+        layout.float_formats,
+        layout.aligns,
+        layout.widths,
+        layout.decimals,
+    ):
+        v, decimal = _prepare_cell(v, t, ff, align, layout.has_invisible, strip)
+        padfn = _padfns[align]
+        if "\n" in v:
+            lines = _split_cell(v, layout.has_invisible, layout.max_lines)
+            cells.append([padfn(width - (w - len(line)), line) for line, w in lines])
+        else:
+            if align == "decimal" and decimal is not None:
+                v += (maxdecimal - decimal) * " "
+            cells.append([padfn(width - (width_fn(v) - len(v)), v)] if v else [])
+    return cells
+
+
+def render(rows, headers, fmt, layout, preserve_whitespace=False):
+    """Render *rows* and *headers* as a table, line by line.
+
+    :param iterable rows: An :term:`iterable` (e.g. list) of rows.
+    :param list headers: The column headers.
+    :param tabulate.TableFormat fmt: The table format.
+    :param ColumnLayout layout: The column layout (see :func:`get_layout`).
+    :return: The lines of the table.
+    :rtype: iterator
+
+    """
+    yield from render_header(headers, fmt, layout)
+    yield from render_rows(rows, fmt, layout, preserve_whitespace)
+    yield from render_footer(fmt, layout)
+
+
+def _is_shown(fmt, line):
+    return getattr(fmt, line) and line not in (fmt.with_header_hide or ())
+
+
+def render_header(headers, fmt, layout):
+    """Render the lines above the rows of a table."""
+    width_fn = tabulate._visible_width if layout.has_invisible else display_width
+    if _is_shown(fmt, "lineabove"):
+        yield _build_line(layout.widths, fmt.padding, fmt.lineabove, layout.aligns)
+    headers = map(str, headers)
+    if layout.fixed:
+        headers = [
+            _fit_cell(h, w) if width_fn(h) > w else h
+            for h, w in zip(headers, layout.widths)
+        ]
+    yield _build_row(
+        [
+            tabulate._align_header(h, a, w, width_fn(h))
+            for h, a, w in zip(headers, layout.aligns, layout.widths)
+        ],
+        fmt.padding,
+        fmt.headerrow,
+    )
+    if _is_shown(fmt, "linebelowheader"):
+        yield _build_line(
+            layout.widths, fmt.padding, fmt.linebelowheader, layout.aligns
+        )
+
+
+def render_rows(rows, fmt, layout, preserve_whitespace=False, continued=False):
+    """Render the *rows* of a table.
+
+    :param bool continued: Whether the rows continue rows that were already
+                           rendered with the same layout.
+
+    """
+    between = None
+    if _is_shown(fmt, "linebetweenrows"):
+        between = _build_line(
+            layout.widths, fmt.padding, fmt.linebetweenrows, layout.aligns
+        )
+    blanks = [" " * w for w in layout.widths]
+    for i, row in enumerate(rows):
+        if (i or continued) and between is not None:
+            yield between
+        if not layout.multiline:
+            yield _build_row(
+                format_row(row, layout, preserve_whitespace), fmt.padding, fmt.datarow
+            )
+            continue
+        cells = format_multiline_row(row, layout, preserve_whitespace)
+        # like tabulate, a row of empty cells takes no lines
+        for n in range(max(map(len, cells))):
+            yield _build_row(
+                [c[n] if n < len(c) else b for c, b in zip(cells, blanks)],
+                fmt.padding,
+                fmt.datarow,
+            )
+
+
+def render_footer(fmt, layout):
+    """Render the lines below the rows of a table."""
+    if _is_shown(fmt, "linebelow"):
+        yield _build_line(layout.widths, fmt.padding, fmt.linebelow, layout.aligns)
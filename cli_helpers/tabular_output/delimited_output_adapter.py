@@ -3,28 +3,32 @@
 
 from __future__ import unicode_literals
 import contextlib
+from itertools import islice
 
 from cli_helpers.compat import csv, StringIO
 from cli_helpers.utils import filter_dict_by_key
+from . import pipeline
 from .preprocessors import bytes_to_string, override_missing_value
 
 supported_formats = ("csv", "csv-tab", "csv-noheader", "csv-tab-noheader")
 preprocessors = (override_missing_value, bytes_to_string)
 
 
-class linewriter(object):
-    def __init__(self):
-        self.reset()
+class linebuffer(list):
+    """A list of the lines written to it by a :func:`csv.writer`."""
 
-    def reset(self):
-        self.line = None
+    write = list.append
 
-    def write(self, d):
-        self.line = d
 
+@pipeline.preprocessor()
+def adapter(data, headers, table_format="csv", batch_size=None, **kwargs):
+    """Wrap the formatting inside a function for TabularOutputFormatter.
 
-def adapter(data, headers, table_format="csv", **kwargs):
-    """Wrap the formatting inside a function for TabularOutputFormatter."""
+    With *batch_size*, the rows are written *batch_size* at a time, and each
+    batch is yielded as one block of newline-separated lines. Joining the
+    output with newlines gives the same text as without it.
+
+    """
     keys = (
         "dialect",
         "delimiter",
@@ -45,13 +49,30 @@ def adapter(data, headers, table_format="csv", **kwargs):
     ckwargs = {"delimiter": delimiter, "lineterminator": ""}
     ckwargs.update(filter_dict_by_key(kwargs, keys))
 
-    l = linewriter()
-    writer = csv.writer(l, **ckwargs)
+    # the csv module decides the quoting of each field faster than any
+    # Python-level check could, so the rows only skip Python-level writes
+    lines = linebuffer()
+    writer = csv.writer(lines, **ckwargs)
     if "noheader" not in table_format:
         writer.writerow(headers)
-        yield l.line
+        yield lines.pop()
+
+    if batch_size:
+        yield from _write_batches(data, writer, lines, batch_size)
+        return
 
+    writerow, pop = writer.writerow, lines.pop
     for row in data:
-        l.reset()
-        writer.writerow(row)
-        yield l.line
+        writerow(row)
+        yield pop()
+
+
+def _write_batches(data, writer, lines, batch_size):
+    """Write the rows of *data* to *lines* in batches of *batch_size* rows."""
+    data = iter(data)
+    while True:
+        writer.writerows(islice(data, batch_size))
+        if not lines:
+            return
+        yield "\n".join(lines)
+        lines.clear()
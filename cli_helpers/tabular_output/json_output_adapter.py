@@ -1,37 +1,374 @@
 # -*- coding: utf-8 -*-
 """A JSON data output adapter"""
 
+from datetime import date, datetime, time
 from decimal import Decimal
+from functools import lru_cache
 from itertools import chain
 import json
+from tempfile import SpooledTemporaryFile
+from json.encoder import encode_basestring, encode_basestring_ascii
+from uuid import UUID
 
+from cli_helpers import utils
+from cli_helpers.compat import orjson
+from . import pipeline
 from .preprocessors import bytes_to_string
 
-supported_formats = ("jsonl", "jsonl_escaped")
+supported_formats = ("jsonl", "jsonl_escaped", "json", "json_columns")
 preprocessors = (bytes_to_string,)
 
+# the size (in bytes) of the encoded values the json_columns format keeps in
+# memory per column, before it writes them to a temporary file
+column_spool_size = 1024 * 1024
+
+
+def _to_json_value(o):
+    """Convert *o* to a value that JSON encoders know, or raise TypeError."""
+    if isinstance(o, Decimal):
+        return float(o)
+    elif isinstance(o, (date, time)):
+        return o.isoformat()
+    elif isinstance(o, UUID):
+        return str(o)
+    elif isinstance(o, memoryview):
+        return utils.bytes_to_string(o.tobytes())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
 
 class CustomEncoder(json.JSONEncoder):
+    """A JSON encoder for Decimal, date, time, UUID and memoryview values.
+
+    :param bool exact_decimals: Whether to encode Decimal values exactly,
+                                instead of as floats (see
+                                :func:`get_value_encoders`), also in lists
+                                and dicts. Only :meth:`encode` without
+                                *indent* and *sort_keys* encodes them
+                                exactly, not :meth:`iterencode`.
+
+    """
+
+    def __init__(self, *args, exact_decimals=False, **kwargs):
+        super(CustomEncoder, self).__init__(*args, **kwargs)
+        self.exact_decimals = exact_decimals
+        self._encode_exactly = None
+
     def default(self, o):
-        if isinstance(o, Decimal):
-            return float(o)
-        else:
+        try:
+            return _to_json_value(o)
+        except TypeError:
             return super(CustomEncoder, self).default(o)
 
+    def encode(self, o):
+        if not self.exact_decimals or self.indent is not None or self.sort_keys:
+            return super(CustomEncoder, self).encode(o)
+        if self._encode_exactly is None:
+            self._encode_exactly = _get_exact_encoder(self)
+        return self._encode_exactly(o)
+
+
+@lru_cache()
+def get_encoder(ensure_ascii=False, exact_decimals=False):
+    """Get the (shared) encoder of the JSON formats."""
+    return CustomEncoder(
+        separators=(",", ":"),
+        ensure_ascii=ensure_ascii,
+        exact_decimals=exact_decimals,
+    )
+
+
+def _encode_float(o):
+    # like json.JSONEncoder, which allows NaN and infinity
+    if o != o:
+        return "NaN"
+    elif o == float("inf"):
+        return "Infinity"
+    elif o == -float("inf"):
+        return "-Infinity"
+    return float.__repr__(o)
+
+
+def _encode_decimal(o):
+    return _encode_float(float(o))
+
+
+def _encode_exact_decimal(o):
+    return str(o) if o.is_finite() else _encode_float(float(o))
+
+
+def get_value_encoders(encoder):
+    """Get the functions that encode a JSON value like *encoder*, by type.
+
+    Dates and times are encoded as ISO 8601 strings, UUIDs as strings, and
+    memoryviews like binary data. Decimal values are encoded as floats,
+    or exactly (e.g. ``1.10``) if the encoder has *exact_decimals* set.
+    Values of other types are encoded by *encoder* itself.
+
+    :param json.JSONEncoder encoder: The encoder.
+    :return: The value encoder of each type.
+    :rtype: dict
+
+    """
+    encode_string = (
+        encode_basestring_ascii if encoder.ensure_ascii else encode_basestring
+    )
+    if getattr(encoder, "exact_decimals", False):
+        encode_decimal = _encode_exact_decimal
+    else:
+        encode_decimal = _encode_decimal
+
+    def encode_isoformat(o):
+        return encode_string(o.isoformat())
+
+    return {
+        str: encode_string,
+        int: int.__repr__,
+        float: _encode_float,
+        bool: {True: "true", False: "false"}.__getitem__,
+        type(None): lambda o: "null",
+        Decimal: encode_decimal,
+        datetime: encode_isoformat,
+        date: encode_isoformat,
+        time: encode_isoformat,
+        UUID: lambda o: encode_string(str(o)),
+        memoryview: lambda o: encode_string(utils.bytes_to_string(o.tobytes())),
+    }
+
+
+def _get_exact_encoder(encoder):
+    """Get a function that encodes any value like *encoder*, with the
+    Decimal values in lists, tuples and dicts encoded exactly too."""
+    encoders = get_value_encoders(encoder)
+    encode_string = encoders[str]
+    item_separator, key_separator = encoder.item_separator, encoder.key_separator
+
+    def fallback(o):
+        return json.JSONEncoder.encode(encoder, o)
+
+    def encode_value(o):
+        return encoders.get(type(o), fallback)(o)
+
+    def encode_key(k):
+        if isinstance(k, str):
+            return encode_string(k)
+        elif k is None or isinstance(k, (bool, int, float)):
+            return '"{}"'.format(encode_value(k))
+        raise TypeError(
+            "keys must be str, int, float, bool or None, "
+            "not {}".format(type(k).__name__)
+        )
+
+    def encode_list(o):
+        return "[" + item_separator.join(map(encode_value, o)) + "]"
+
+    def encode_dict(o):
+        items = (encode_key(k) + key_separator + encode_value(v) for k, v in o.items())
+        return "{" + item_separator.join(items) + "}"
+
+    encoders.update({list: encode_list, tuple: encode_list, dict: encode_dict})
+    return encode_value
+
+
+def _get_key_prefixes(headers, encoder):
+    """Get the encoded keys of *headers*, each with the text before it."""
+    prefixes = [encoder.encode({h: None})[:-5] for h in headers]
+    return [p if i == 0 else "," + p[1:] for i, p in enumerate(prefixes)]
+
 
-def adapter(data, headers, table_format="jsonl", **_kwargs):
-    """Wrap the formatting inside a function for TabularOutputFormatter."""
-    if table_format == "jsonl":
+def _get_column_encoders(first, column_types, encoder):
+    """Get the encoder of each column, and the encoder of any value.
+
+    The column encoders are resolved once from *column_types* (or the types
+    of the values in the *first* row). A column encoder is only used for
+    values of its column's type.
+
+    :return: The ``(column_type, encode)`` pair of each column, and the
+             function that encodes any value.
+    :rtype: tuple
+
+    """
+    if column_types is None or len(column_types) != len(first):
+        column_types = [type(v) for v in first]
+    encoders = get_value_encoders(encoder)
+    get_encoder_by_type, fallback = encoders.get, encoder.encode
+
+    def encode_value(value):
+        return get_encoder_by_type(type(value), fallback)(value)
+
+    columns = [(t, encoders.get(t, encode_value)) for t in column_types]
+    return columns, encode_value
+
+
+def encode_rows(data, headers, encoder, column_types=None):
+    """Encode each row of *data* as a JSON object with the *headers* as keys.
+
+    The keys are encoded once, and each value is encoded by a function
+    chosen for its column's type (see *column_types*, or the types in the
+    first row), so no dict is built per row.
+
+    :return: The JSON object of each row.
+    :rtype: iterator
+
+    """
+    headers = list(headers)
+    data = iter(data)
+    first = next(data, None)
+    if first is None:
+        return
+    if not isinstance(first, (list, tuple)):
+        first = list(first)
+    if not headers or len(first) != len(headers):
+        # empty objects, or the error of a strict zip
+        for row in chain((first,), data):
+            yield encoder.encode(dict(zip(headers, row, strict=True)))
+        return
+
+    ncols = len(headers)
+    # like in a dict, a key is where it first occurs, with its last value
+    keys = {h: i for i, h in enumerate(headers)}
+    indexes = list(keys.values()) if len(keys) < ncols else None
+    columns, encode_value = _get_column_encoders(first, column_types, encoder)
+    if indexes is not None:
+        columns = [columns[i] for i in indexes]
+    prefixes = _get_key_prefixes(keys, encoder)
+    columns = [(p, t, encode) for p, (t, encode) in zip(prefixes, columns)]
+    for row in chain((first,), data):
+        if not isinstance(row, (list, tuple)):
+            row = list(row)
+        if len(row) != ncols:
+            # raises the error of a strict zip
+            yield encoder.encode(dict(zip(headers, row, strict=True)))
+            continue
+        if indexes is not None:
+            row = [row[i] for i in indexes]
+        values = [
+            prefix + (encode(v) if type(v) is t else encode_value(v))
+            for (prefix, t, encode), v in zip(columns, row)
+        ]
+        yield "".join(values) + "}"
+
+
+def _add_commas(lines):
+    """Add a comma to each of *lines* but the last."""
+    previous = None
+    for line in lines:
+        if previous is not None:
+            yield previous + ","
+        previous = line
+    if previous is not None:
+        yield previous
+
+
+def encode_array(data, headers, encoder, column_types=None):
+    """Encode *data* as a JSON array of objects, one row per line.
+
+    :return: The lines of the JSON document.
+    :rtype: iterator
+
+    """
+    yield "["
+    yield from _add_commas(encode_rows(data, headers, encoder, column_types))
+    yield "]"
+
+
+def encode_columns(data, headers, encoder, column_types=None):
+    """Encode *data* as a JSON object with an array of values per column.
+
+    No dict is built per row: the encoded values are spooled per column (in
+    memory, then on disk once a column grows past
+    :data:`column_spool_size`), and the document is output one value per
+    line.
+
+    :return: The lines of the JSON document.
+    :rtype: iterator
+
+    """
+    headers = list(headers)
+    # like in a dict, a key is where it first occurs, with its last column
+    indexes = {h: i for i, h in enumerate(headers)}
+    spools = [
+        SpooledTemporaryFile(column_spool_size, "w+", encoding="utf-8", newline="\n")
+        for _ in headers
+    ]
+    try:
+        data = iter(data)
+        first = next(data, None)
+        if first is not None:
+            _spool_columns(chain((first,), data), first, spools, encoder, column_types)
+
+        yield "{"
+        for n, (h, i) in enumerate(indexes.items()):
+            yield encoder.encode({h: None})[1:-5] + "["
+            spools[i].seek(0)
+            yield from _add_commas(line[:-1] for line in spools[i])
+            yield "]," if n < len(indexes) - 1 else "]"
+        yield "}"
+    finally:
+        for spool in spools:
+            spool.close()
+
+
+def _spool_columns(data, first, spools, encoder, column_types):
+    """Write the encoded values of each column to its spool, one per line."""
+    columns, encode_value = _get_column_encoders(first, column_types, encoder)
+    columns = [(t, encode, spool.write) for (t, encode), spool in zip(columns, spools)]
+    for row in data:
+        if not isinstance(row, (list, tuple)):
+            row = list(row)
+        if len(row) != len(spools):
+            raise ValueError("Each row must have one value per header.")
+        for (t, encode, write), v in zip(columns, row):
+            write((encode(v) if type(v) is t else encode_value(v)) + "\n")
+
+
+def _encode_rows_with_orjson(data, headers):
+    """Encode each row of *data* as a JSON object with orjson."""
+    options = orjson.OPT_NON_STR_KEYS
+    for row in data:
+        yield orjson.dumps(
+            dict(zip(headers, row, strict=True)), default=_to_json_value, option=options
+        ).decode("utf-8")
+
+
+@pipeline.preprocessor()
+def adapter(
+    data,
+    headers,
+    table_format="jsonl",
+    column_types=None,
+    json_backend=None,
+    exact_decimals=False,
+    **_kwargs,
+):
+    """Wrap the formatting inside a function for TabularOutputFormatter.
+
+    Besides JSON lines, the data can be output as a single JSON document:
+    an array of objects (``json``), or an object with an array of values
+    per column (``json_columns``). Both are output line by line.
+
+    With ``json_backend="orjson"``, the ``jsonl`` format is encoded with
+    `orjson <https://github.com/ijl/orjson>`_ when it is installed. Its
+    output is valid JSON, but not always the same text (e.g. ``1e16``
+    instead of ``1e+16``, and ``null`` for NaN).
+
+    Dates, times and UUIDs are output as strings. Decimal values are output
+    as floats, unless *exact_decimals* is set (see
+    :func:`get_value_encoders`).
+
+    """
+    if table_format in ("jsonl", "json", "json_columns"):
         ensure_ascii = False
     elif table_format == "jsonl_escaped":
         ensure_ascii = True
     else:
         raise ValueError("Invalid table_format specified.")
 
-    for row in chain(data):
-        yield json.dumps(
-            dict(zip(headers, row, strict=True)),
-            cls=CustomEncoder,
-            separators=(",", ":"),
-            ensure_ascii=ensure_ascii,
-        )
+    encoder = get_encoder(ensure_ascii, exact_decimals)
+    if table_format == "json":
+        yield from encode_array(data, headers, encoder, column_types)
+    elif table_format == "json_columns":
+        yield from encode_columns(data, headers, encoder, column_types)
+    elif json_backend == "orjson" and orjson and not (ensure_ascii or exact_decimals):
+        yield from _encode_rows_with_orjson(data, headers)
+    else:
+        yield from encode_rows(data, headers, encoder, column_types)
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""A streaming writer for tabulate's markup formats (e.g. HTML and LaTeX).
+
+The writer yields the document prologue, then one row at a time, then the
+epilogue, with the same output as :func:`tabulate.tabulate`. Only the
+column types are computed from the data up front.
+
+"""
+
+from __future__ import unicode_literals
+
+import tabulate
+
+supported_formats = (
+    "html",
+    "jira",
+    "latex",
+    "latex_booktabs",
+    "mediawiki",
+    "moinmoin",
+    "textile",
+)
+
+HTML_ESCAPES = str.maketrans(
+    {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#x27;"}
+)
+LATEX_ESCAPES = str.maketrans(tabulate.LATEX_ESCAPE_RULES)
+
+
+def _html_row(celltag, cells, colwidths, colaligns):
+    return "<tr>{}</tr>".format(
+        "".join(
+            "<{0}>{1}</{0}>".format(celltag, c.translate(HTML_ESCAPES)) for c in cells
+        )
+    )
+
+
+def _html_header_row(cells, colwidths, colaligns):
+    return "<table>\n<thead>\n{}\n</thead>\n<tbody>".format(
+        _html_row("th", cells, colwidths, colaligns)
+    )
+
+
+def _html_data_row(cells, colwidths, colaligns):
+    return _html_row("td", cells, colwidths, colaligns)
+
+
+def _latex_row(cells, colwidths, colaligns):
+    return ("&".join(c.translate(LATEX_ESCAPES) for c in cells) + "\\\\").rstrip()
+
+
+# rows that are escaped with translate tables instead of tabulate's escaping
+_rows = {
+    "html": (_html_header_row, _html_data_row),
+    "latex": (_latex_row, _latex_row),
+    "latex_booktabs": (_latex_row, _latex_row),
+}
+
+
+def render(
+    rows,
+    headers,
+    table_format,
+    column_types,
+    floatfmt=tabulate._DEFAULT_FLOATFMT,
+    has_invisible=False,
+):
+    """Render *rows* and *headers* as a *table_format* document, row by row.
+
+    The cells are not aligned, like in :func:`tabulate.tabulate` when
+    *numalign* and *stralign* are :data:`None`.
+
+    :param iterable rows: An :term:`iterable` (e.g. list) of rows.
+    :param list headers: The column headers.
+    :param str table_format: One of the :data:`supported_formats`.
+    :param list column_types: The tabulate column types (see
+                              :func:`~.aligned_table.get_column_types`).
+    :param str floatfmt: The format of floating point numbers.
+    :param bool has_invisible: Whether the cells contain ANSI escape
+                               sequences.
+    :return: The lines of the document.
+    :rtype: iterator
+
+    """
+    for part in _render_parts(
+        rows, headers, table_format, column_types, floatfmt, has_invisible
+    ):
+        # the prologue and epilogue (and cells) can span several lines
+        yield from part.split("\n")
+
+
+def _render_parts(rows, headers, table_format, column_types, floatfmt, has_invisible):
+    fmt = tabulate._table_formats[table_format]
+    headerrow, datarow = _rows.get(table_format, (fmt.headerrow, fmt.datarow))
+    widths = len(column_types) * [0]
+    aligns = len(column_types) * [None]
+    hidden = fmt.with_header_hide or ()
+    pad = " " * fmt.padding
+
+    if fmt.lineabove and "lineabove" not in hidden:
+        yield tabulate._build_line(widths, aligns, fmt.lineabove)
+    yield tabulate._build_row(
+        [pad + str(h) + pad for h in headers], widths, aligns, headerrow
+    )
+    if fmt.linebelowheader and "linebelowheader" not in hidden:
+        yield tabulate._build_line(widths, aligns, fmt.linebelowheader)
+
+    between = None
+    if fmt.linebetweenrows and "linebetweenrows" not in hidden:
+        between = tabulate._build_line(widths, aligns, fmt.linebetweenrows)
+    for i, row in enumerate(rows):
+        if i and between is not None:
+            yield between
+        cells = [
+            pad + tabulate._format(v, t, floatfmt, "", "", has_invisible) + pad
+            for v, t in zip(row, column_types)
+        ]
+        yield tabulate._build_row(cells, widths, aligns, datarow)
+
+    if fmt.linebelow and "linebelow" not in hidden:
+        yield tabulate._build_line(widths, aligns, fmt.linebelow)
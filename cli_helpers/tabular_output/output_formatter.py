@@ -11,8 +11,9 @@ from cli_helpers.compat import (
     float_types,
     zip_longest,
 )
-from cli_helpers.utils import unique_items
+from cli_helpers.utils import sample_rows, unique_items
 from . import (
+    pipeline,
     delimited_output_adapter,
     vertical_table_adapter,
     tabulate_adapter,
@@ -150,6 +151,11 @@ class TabularOutputFormatter(object):
             :class:`TabularOutputFormatter` object has a default format set).
         :param tuple preprocessors: Additional preprocessors to call before
                                     any formatter preprocessors.
+        :param iterable column_types: The columns' type objects (e.g. int or
+            float). They are inferred from *data* (or from its first
+            *sample_size* rows, if given, else its first *window_size* rows,
+            or the rows that fixed *column_widths* are checked against) when
+            a preprocessor or the formatter needs them.
         :param \*\*kwargs: Optional arguments for the formatter.
         :return: The formatted data.
         :rtype: str
@@ -162,12 +168,23 @@ class TabularOutputFormatter(object):
 
         (_, _preprocessors, formatter, fkwargs) = self._output_formats[format_name]
         fkwargs.update(kwargs)
-        if column_types is None:
-            data = list(data)
-            column_types = self._get_column_types(data)
-        for f in unique_items(preprocessors + _preprocessors):
+        preprocessors = pipeline.plan(
+            unique_items(preprocessors + _preprocessors), fkwargs
+        )
+        if column_types is None and pipeline.needs_column_types(
+            preprocessors + (formatter,)
+        ):
+            sample_size = fkwargs.get("sample_size") or fkwargs.get("window_size")
+            if sample_size is None and fkwargs.get("column_widths") is not None:
+                # the adapter lays out fixed columns from the same sample
+                sample_size = tabulate_adapter.fixed_sample_size
+            sample, data = sample_rows(data, sample_size)
+            column_types = self._get_column_types(sample)
+        for f in pipeline.plan(preprocessors, fkwargs, column_types):
             data, headers = f(data, headers, column_types=column_types, **fkwargs)
-        return formatter(list(data), headers, column_types=column_types, **fkwargs)
+        if not pipeline.is_streaming((formatter,)):
+            data = list(data)
+        return formatter(data, headers, column_types=column_types, **fkwargs)
 
     def _get_column_types(self, data):
         """Get a list of the data types for each column in *data*."""
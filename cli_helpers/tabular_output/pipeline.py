@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""Declare what preprocessors and formatters need, so output can be planned.
+
+Preprocessors (and formatters) can describe themselves with the
+:func:`preprocessor` decorator::
+
+    from cli_helpers.tabular_output.pipeline import preprocessor
+
+    @preprocessor(column_types=(float,), noop_unless=("precision",))
+    def round_floats(data, headers, column_types=(), precision=None, **_):
+        ...
+
+:class:`~cli_helpers.tabular_output.TabularOutputFormatter` uses this to
+skip preprocessors that would do nothing, to only infer the column types
+when something needs them, and to stream data to formatters that accept
+an iterator. Functions without a declaration are assumed to need
+everything.
+
+"""
+
+from __future__ import unicode_literals
+from collections import namedtuple
+
+PreprocessorInfo = namedtuple(
+    "PreprocessorInfo", "streaming column_types noop_unless headers"
+)
+
+
+def preprocessor(streaming=True, column_types=None, noop_unless=(), headers=True):
+    """Declare how a preprocessor or formatter function processes data.
+
+    :param bool streaming: Whether rows are processed one at a time. If
+                           not, the function reads all the data first.
+    :param tuple column_types: The column types (e.g. int or float) the
+                               function changes or treats specially. The
+                               column types are only inferred from the data
+                               if a function declares them. Use
+                               :data:`None` for all columns.
+    :param tuple noop_unless: The keyword arguments that make the function
+                              do something. If none of them is set, the
+                              function is skipped.
+    :param bool headers: Whether the function changes the headers.
+    :return: A decorator that attaches a :class:`PreprocessorInfo` to the
+             function.
+
+    """
+    info = PreprocessorInfo(streaming, column_types, tuple(noop_unless), headers)
+
+    def decorator(f):
+        f.preprocessor_info = info
+        return f
+
+    return decorator
+
+
+def get_info(f):
+    """Get the :class:`PreprocessorInfo` of *f*, or :data:`None`."""
+    return getattr(f, "preprocessor_info", None)
+
+
+def is_noop(f, kwargs, column_types=None):
+    """Check if preprocessor *f* would leave the data and headers unchanged.
+
+    :param callable f: The preprocessor.
+    :param dict kwargs: The keyword arguments it would be called with.
+    :param iterable column_types: The columns' type objects, if known.
+
+    """
+    info = get_info(f)
+    if info is None:
+        return False
+    if info.noop_unless and not any(kwargs.get(k) for k in info.noop_unless):
+        return True
+    return (
+        column_types is not None
+        and info.column_types is not None
+        and not info.headers
+        and not set(info.column_types).intersection(column_types)
+    )
+
+
+def needs_column_types(functions):
+    """Check if any of *functions* needs the column types."""
+    for f in functions:
+        info = get_info(f)
+        if info is None or info.column_types is not None:
+            return True
+    return False
+
+
+def is_streaming(functions):
+    """Check if all *functions* process rows one at a time."""
+    for f in functions:
+        info = get_info(f)
+        if info is None or not info.streaming:
+            return False
+    return True
+
+
+def plan(preprocessors, kwargs, column_types=None):
+    """Get the *preprocessors* that need to run (in order).
+
+    :param iterable preprocessors: The preprocessors.
+    :param dict kwargs: The keyword arguments they will be called with.
+    :param iterable column_types: The columns' type objects, if known.
+    :return: The preprocessors that change the data or headers.
+    :rtype: tuple
+
+    """
+    return tuple(f for f in preprocessors if not is_noop(f, kwargs, column_types))
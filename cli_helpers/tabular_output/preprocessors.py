@@ -2,12 +2,14 @@
 """These preprocessor functions are used to process data prior to output."""
 
 import string
-from datetime import datetime
+from datetime import date
 
 from cli_helpers import utils
 from cli_helpers.compat import text_type, int_types, float_types, HAS_PYGMENTS, Token
+from . import pipeline
 
 
+@pipeline.preprocessor(noop_unless=("max_field_width",))
 def truncate_string(
     data, headers, max_field_width=None, skip_multiline_string=True, **_
 ):
@@ -37,6 +39,28 @@ def truncate_string(
     )
 
 
+@pipeline.preprocessor(noop_unless=("max_col_width",), headers=False)
+def wrap_string(data, headers, max_col_width=None, **_):
+    """Wrap long strings into lines of at most *max_col_width* display columns.
+
+    Unlike :func:`truncate_string`, no text is lost: long values span several
+    lines in formats that support multiline cells. Wrapped values are cached
+    (see :func:`cli_helpers.utils.wrap_string`).
+
+    :param iterable data: An :term:`iterable` (e.g. list) of rows.
+    :param iterable headers: The column headers.
+    :param int max_col_width: Width to wrap fields to for display.
+    :return: The processed data and headers.
+    :rtype: tuple
+
+    """
+    return (
+        ([utils.wrap_string(v, max_col_width) for v in row] for row in data),
+        headers,
+    )
+
+
+@pipeline.preprocessor()
 def convert_to_string(data, headers, **_):
     """Convert all *data* and *headers* to strings.
 
@@ -55,6 +79,34 @@ def convert_to_string(data, headers, **_):
     )
 
 
+@pipeline.preprocessor()
+def convert_to_display_string(
+    data, headers, max_field_width=None, max_col_width=None, **_
+):
+    """Convert all *data* and *headers* to strings, to be truncated next.
+
+    Like :func:`convert_to_string`, but binary data much longer than
+    *max_field_width* is only partially converted. Only use it before
+    :func:`truncate_string`, which cuts the values short anyway. Values
+    that are wrapped to *max_col_width* instead are converted in full.
+
+    :param iterable data: An :term:`iterable` (e.g. list) of rows.
+    :param iterable headers: The column headers.
+    :param int max_field_width: Width to truncate field for display
+    :param int max_col_width: Width to wrap fields to for display.
+    :return: The processed data and headers.
+    :rtype: tuple
+
+    """
+    if max_col_width:
+        max_field_width = None
+    return (
+        ([utils.to_string(v, max_field_width) for v in row] for row in data),
+        [utils.to_string(h) for h in headers],
+    )
+
+
+@pipeline.preprocessor()
 def convert_to_undecoded_string(data, headers, **_):
     """Convert all *data* and *headers* to hex, if needed.
 
@@ -75,6 +127,7 @@ def convert_to_undecoded_string(data, headers, **_):
     )
 
 
+@pipeline.preprocessor(headers=False)
 def override_missing_value(
     data,
     headers,
@@ -97,24 +150,17 @@ def override_missing_value(
 
     """
 
+    if style and HAS_PYGMENTS:
+        missing_value = utils.style_field(missing_value_token, missing_value, style)
+
     def fields():
         for row in data:
-            processed = []
-            for field in row:
-                if field is None and style and HAS_PYGMENTS:
-                    styled = utils.style_field(
-                        missing_value_token, missing_value, style
-                    )
-                    processed.append(styled)
-                elif field is None:
-                    processed.append(missing_value)
-                else:
-                    processed.append(field)
-            yield processed
+            yield [missing_value if field is None else field for field in row]
 
     return (fields(), headers)
 
 
+@pipeline.preprocessor(headers=False)
 def override_tab_value(data, headers, new_value="    ", **_):
     """Override tab values in the *data* with *new_value*.
 
@@ -125,15 +171,14 @@ def override_tab_value(data, headers, new_value="    ", **_):
     :rtype: tuple
 
     """
+    escape = utils.get_escaper((("\t", new_value),))
     return (
-        (
-            [v.replace("\t", new_value) if isinstance(v, text_type) else v for v in row]
-            for row in data
-        ),
+        ([escape(v) if isinstance(v, text_type) else v for v in row] for row in data),
         headers,
     )
 
 
+@pipeline.preprocessor(headers=False)
 def escape_newlines(data, headers, **_):
     """Escape newline characters (\n -> \\n, \r -> \\r)
 
@@ -143,22 +188,14 @@ def escape_newlines(data, headers, **_):
     :rtype: tuple
 
     """
+    escape = utils.get_escaper(utils.NEWLINE_ESCAPES)
     return (
-        (
-            [
-                (
-                    v.replace("\r", r"\r").replace("\n", r"\n")
-                    if isinstance(v, text_type)
-                    else v
-                )
-                for v in row
-            ]
-            for row in data
-        ),
+        ([escape(v) if isinstance(v, text_type) else v for v in row] for row in data),
         headers,
     )
 
 
+@pipeline.preprocessor()
 def bytes_to_string(data, headers, **_):
     """Convert all *data* and *headers* bytes to strings.
 
@@ -177,7 +214,10 @@ def bytes_to_string(data, headers, **_):
     )
 
 
-def align_decimals(data, headers, column_types=(), **_):
+@pipeline.preprocessor(streaming=False, column_types=(float,), headers=False)
+def align_decimals(
+    data, headers, column_types=(), column_precisions=None, sample_size=None, **_
+):
     """Align numbers in *data* on their decimal points.
 
     Whitespace padding is added before a number so that all numbers in a
@@ -195,36 +235,68 @@ def align_decimals(data, headers, column_types=(), **_):
          2.1
         10.59
 
+    By default, all of *data* is scanned to find the widest integer part
+    before anything is yielded. To stream the data instead, declare the
+    columns' precision and scale (e.g. from the DB-API cursor description)
+    with *column_precisions*, or limit the scan to the first *sample_size*
+    rows. A number whose integer part is wider than expected is not padded,
+    and the following rows in its column are aligned to it.
+
     :param iterable data: An :term:`iterable` (e.g. list) of rows.
     :param iterable headers: The column headers.
     :param iterable column_types: The columns' type objects (e.g. int or float).
+    :param iterable column_precisions: A ``(precision, scale)`` pair (or
+                                       :data:`None`, if unknown) for each column.
+                                       A :data:`None` precision is unknown
+                                       too.
+    :param int sample_size: The number of rows to scan for columns without a
+                            declared precision.
     :return: The processed data and headers.
     :rtype: tuple
 
     """
+    decimal_columns = [i for i, t in enumerate(column_types) if t is float]
+    if not decimal_columns:
+        return iter(data), headers
+
     pointpos = len(headers) * [0]
-    data = list(data)
-    for row in data:
-        for i, v in enumerate(row):
-            if column_types[i] is float and type(v) in float_types:
-                v = text_type(v)
-                pointpos[i] = max(utils.intlen(v), pointpos[i])
+    scanned_columns = []
+    for i in decimal_columns:
+        precision = column_precisions[i] if column_precisions else None
+        if precision and precision[0] is not None:
+            # the integer digits (at least a "0"), and a minus sign
+            pointpos[i] = max(precision[0] - (precision[1] or 0), 1) + 1
+        else:
+            scanned_columns.append(i)
+
+    if scanned_columns:
+        sample, data = utils.sample_rows(data, sample_size)
+        for row in sample:
+            for i in scanned_columns:
+                v = row[i]
+                if type(v) in float_types:
+                    pointpos[i] = max(utils.intlen(text_type(v)), pointpos[i])
 
     def results(data):
         for row in data:
-            result = []
-            for i, v in enumerate(row):
-                if column_types[i] is float and type(v) in float_types:
+            result = list(row)
+            for i in decimal_columns:
+                v = result[i]
+                if type(v) in float_types:
                     v = text_type(v)
-                    result.append((pointpos[i] - utils.intlen(v)) * " " + v)
-                else:
-                    result.append(v)
+                    width = utils.intlen(v)
+                    if width > pointpos[i]:
+                        pointpos[i] = width
+                    result[i] = (pointpos[i] - width) * " " + v
             yield result
 
     return results(data), headers
 
 
-def quote_whitespaces(data, headers, quotestyle="'", **_):
+@pipeline.preprocessor(streaming=False, headers=False)
+def quote_whitespaces(
+    data, headers, quotestyle="'", column_types=(), sample_size=None, **_
+):
     """Quote leading/trailing whitespace in *data*.
 
     When outputing data with leading or trailing whitespace, it can be useful
@@ -232,6 +304,11 @@ def quote_whitespaces(data, headers, quotestyle="'", **_):
     apparent. If one value in a column needs quoted, then all values in that
     column are quoted to keep things consistent.
 
+    Only text columns are checked for whitespace (all columns, when
+    *column_types* is not given). By default, all of *data* is scanned
+    before anything is yielded. Use *sample_size* to only scan the first
+    rows and stream the rest; columns are then quoted based on the sample.
+
     .. NOTE::
        :data:`string.whitespace` is used to determine which characters are
        whitespace.
@@ -239,34 +316,44 @@ def quote_whitespaces(data, headers, quotestyle="'", **_):
     :param iterable data: An :term:`iterable` (e.g. list) of rows.
     :param iterable headers: The column headers.
     :param str quotestyle: The quotation mark to use (defaults to ``'``).
+    :param iterable column_types: The columns' type objects (e.g. int or float).
+    :param int sample_size: The number of rows to scan for whitespace.
     :return: The processed data and headers.
     :rtype: tuple
 
     """
-    whitespace = tuple(string.whitespace)
+    whitespace = frozenset(string.whitespace)
     quote = len(headers) * [False]
-    data = list(data)
-    for row in data:
-        for i, v in enumerate(row):
-            v = text_type(v)
-            if v.startswith(whitespace) or v.endswith(whitespace):
+    if column_types:
+        pending = [i for i, t in enumerate(column_types) if t is text_type]
+    else:
+        pending = list(range(len(headers)))
+
+    sample, data = utils.sample_rows(data, sample_size)
+    for row in sample:
+        if not pending:
+            break
+        for i in pending:
+            v = row[i]
+            if type(v) is not text_type:
+                v = text_type(v)
+            if v and (v[0] in whitespace or v[-1] in whitespace):
                 quote[i] = True
+        pending = [i for i in pending if not quote[i]]
 
     def results(data):
+        quotes = [quotestyle if q else "" for q in quote]
+        if not any(quote):
+            for row in data:
+                yield [text_type(v) for v in row]
+            return
         for row in data:
-            result = []
-            for i, v in enumerate(row):
-                quotation = quotestyle if quote[i] else ""
-                result.append(
-                    "{quotestyle}{value}{quotestyle}".format(
-                        quotestyle=quotation, value=v
-                    )
-                )
-            yield result
+            yield [q + text_type(v) + q for q, v in zip(quotes, row)]
 
     return results(data), headers
 
 
+@pipeline.preprocessor(noop_unless=("style",))
 def style_output(
     data,
     headers,
@@ -274,6 +361,8 @@ def style_output(
     header_token=Token.Output.Header,
     odd_row_token=Token.Output.OddRow,
     even_row_token=Token.Output.EvenRow,
+    row_style_mode="field",
+    table_separator_token=Token.Output.TableSeparator,
     **_,
 ):
     """Style the *data* and *headers* (e.g. bold, italic, and colors)
@@ -309,6 +398,13 @@ def style_output(
     :param str header_token: The token type to be used for the headers.
     :param str odd_row_token: The token type to be used for odd rows.
     :param str even_row_token: The token type to be used for even rows.
+    :param str row_style_mode: ``'field'`` styles every field separately.
+        ``'line'`` applies the row style once per rendered line, which cuts
+        the number of escape sequences for adapters that render a row on one
+        line. Rows with multiline fields are always styled per field.
+    :param str table_separator_token: The token type used for the table
+        separators. In ``'line'`` mode, the row style is re-opened after
+        styled separators.
     :return: The styled data and headers.
     :rtype: tuple
 
@@ -316,7 +412,7 @@ def style_output(
     from cli_helpers.utils import filter_style_table
 
     relevant_styles = filter_style_table(
-        style, header_token, odd_row_token, even_row_token
+        style, header_token, odd_row_token, even_row_token, table_separator_token
     )
     if style and HAS_PYGMENTS:
         if relevant_styles.get(header_token):
@@ -324,21 +420,38 @@ def style_output(
                 utils.style_field(header_token, header, style) for header in headers
             ]
         if relevant_styles.get(odd_row_token) or relevant_styles.get(even_row_token):
-            data = (
-                [
-                    utils.style_field(
-                        odd_row_token if i % 2 else even_row_token, f, style
-                    )
-                    for f in r
-                ]
-                for i, r in enumerate(data, 1)
-            )
+            odd_codes = utils.get_style_codes(odd_row_token, style)
+            even_codes = utils.get_style_codes(even_row_token, style)
+            reopen = bool(relevant_styles.get(table_separator_token))
+
+            def styled_rows(data):
+                apply_style_codes = utils.apply_style_codes
+                for i, r in enumerate(data, 1):
+                    prefix, suffix = odd_codes if i % 2 else even_codes
+                    if row_style_mode == "line" and not any("\n" in f for f in r):
+                        yield utils.apply_row_style_codes(r, prefix, suffix, reopen)
+                    else:
+                        yield [apply_style_codes(f, prefix, suffix) for f in r]
+
+            data = styled_rows(data)
 
     return iter(data), headers
 
 
+@pipeline.preprocessor(
+    column_types=(int, float),
+    noop_unless=("integer_format", "float_format"),
+    headers=False,
+)
 def format_numbers(
-    data, headers, column_types=(), integer_format=None, float_format=None, **_
+    data,
+    headers,
+    column_types=(),
+    integer_format=None,
+    float_format=None,
+    thousands_separator=None,
+    decimal_point=None,
+    **_,
 ):
     """Format numbers according to a format specification.
 
@@ -347,6 +460,10 @@ def format_numbers(
     :class:`~decimal.Decimal`. See the :ref:`python:formatspec` for more
     information about the format strings.
 
+    For locale-style grouping, use the ``,`` option in the format strings and
+    set *thousands_separator* and *decimal_point* (e.g. to the values from
+    :func:`locale.localeconv`).
+
     .. NOTE::
        A column is only formatted if all of its values are the same type
        (except for :data:`None`).
@@ -356,6 +473,8 @@ def format_numbers(
     :param iterable column_types: The columns' type objects (e.g. int or float).
     :param str integer_format: The format string to use for integer columns.
     :param str float_format: The format string to use for float columns.
+    :param str thousands_separator: The character that replaces ``,``.
+    :param str decimal_point: The character that replaces ``.``.
     :return: The processed data and headers.
     :rtype: tuple
 
@@ -363,19 +482,50 @@ def format_numbers(
     if (integer_format is None and float_format is None) or not column_types:
         return iter(data), headers
 
-    def _format_number(field, column_type):
-        if integer_format and column_type is int and type(field) in int_types:
-            return format(field, integer_format)
-        elif float_format and column_type is float and type(field) in float_types:
-            return format(field, float_format)
-        return field
+    separators = {}
+    if thousands_separator is not None:
+        separators[","] = thousands_separator
+    if decimal_point is not None:
+        separators["."] = decimal_point
+    translation = str.maketrans(separators) if separators else None
+
+    def column_formatter(types, format_spec):
+        if translation:
+
+            def format_number(field):
+                if type(field) in types:
+                    return format(field, format_spec).translate(translation)
+                return field
+
+        else:
+
+            def format_number(field):
+                if type(field) in types:
+                    return format(field, format_spec)
+                return field
+
+        return format_number
+
+    formatters = []
+    for i, column_type in enumerate(column_types):
+        if integer_format and column_type is int:
+            formatters.append((i, column_formatter(int_types, integer_format)))
+        elif float_format and column_type is float:
+            formatters.append((i, column_formatter(float_types, float_format)))
+    if not formatters:
+        return iter(data), headers
 
-    data = (
-        [_format_number(v, column_types[i]) for i, v in enumerate(row)] for row in data
-    )
-    return data, headers
+    def results(data):
+        for row in data:
+            result = list(row)
+            for i, format_number in formatters:
+                result[i] = format_number(result[i])
+            yield result
+
+    return results(data), headers
 
 
+@pipeline.preprocessor(noop_unless=("column_date_formats",), headers=False)
 def format_timestamps(data, headers, column_date_formats=None, **_):
     """Format timestamps according to user preference.
 
@@ -387,6 +537,9 @@ def format_timestamps(data, headers, column_date_formats=None, **_):
 
     Example: `signup_date = "%Y-%m-%d"`
 
+    :class:`~datetime.datetime` and :class:`~datetime.date` values are
+    formatted directly, and strings are parsed as ISO 8601 timestamps.
+
     :param iterable data: An :term:`iterable` (e.g. list) of rows.
     :param iterable headers: The column headers.
     :param str column_date_format: The format strings to use for specific columns.
@@ -397,21 +550,24 @@ def format_timestamps(data, headers, column_date_formats=None, **_):
     if column_date_formats is None:
         return iter(data), headers
 
-    def _format_timestamp(value, name, column_date_formats):
-        if name not in column_date_formats:
-            return value
-        try:
-            dt = datetime.fromisoformat(value)
-            return dt.strftime(column_date_formats[name])
-        except (ValueError, TypeError):
-            # not a date
-            return value
-
-    data = (
-        [
-            _format_timestamp(v, headers[i], column_date_formats)
-            for i, v in enumerate(row)
-        ]
-        for row in data
-    )
-    return data, headers
+    date_formats = [
+        (i, column_date_formats[name])
+        for i, name in enumerate(headers)
+        if name in column_date_formats
+    ]
+    if not date_formats:
+        return iter(data), headers
+
+    def results(data):
+        format_timestamp = utils.format_timestamp
+        for row in data:
+            result = list(row)
+            for i, date_format in date_formats:
+                v = result[i]
+                if isinstance(v, text_type):
+                    result[i] = format_timestamp(v, date_format)
+                elif isinstance(v, date):
+                    result[i] = v.strftime(date_format)
+            yield result
+
+    return results(data), headers
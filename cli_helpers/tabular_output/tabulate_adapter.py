@@ -3,27 +3,34 @@
 
 from __future__ import unicode_literals
 
-import os
-
-from cli_helpers.utils import filter_dict_by_key, version_as_tuple
-from cli_helpers.compat import (
-    Terminal256Formatter,
-    TerminalTrueColorFormatter,
-    Token,
-    StringIO,
+from functools import lru_cache
+from itertools import islice
+
+from cli_helpers.utils import (
+    NEWLINE_ESCAPES,
+    apply_style_codes,
+    filter_dict_by_key,
+    get_escaper,
+    get_style_codes,
+    is_truecolor,
+    merge_style_codes,
+    sample_rows,
+    version_as_tuple,
 )
+from cli_helpers.compat import Token, float_types, int_types
+from . import aligned_table, markup_table, pipeline
 from .preprocessors import (
-    convert_to_string,
+    convert_to_display_string,
     truncate_string,
     override_missing_value,
     style_output,
     HAS_PYGMENTS,
     escape_newlines,
+    wrap_string,
 )
 
 import tabulate
 
-
 tabulate.MIN_PADDING = 0
 
 tabulate._table_formats["psql_unicode"] = tabulate.TableFormat(
@@ -144,6 +151,25 @@ supported_table_formats = (
 
 supported_formats = supported_markup_formats + supported_table_formats
 
+# the number of rows that decide the column types and alignments when only
+# the column widths are given
+fixed_sample_size = 100
+
+# box formats that are rendered line by line, without building the table
+# as one string first
+streaming_table_formats = (
+    "ascii",
+    "ascii_escaped",
+    "double",
+    "fancy_grid",
+    "grid",
+    "mysql",
+    "mysql_heavy",
+    "mysql_unicode",
+    "psql",
+    "psql_unicode",
+)
+
 default_kwargs = {
     "ascii": {"numalign": "left"},
     "ascii_escaped": {"numalign": "left"},
@@ -158,99 +184,161 @@ def has_new_preserve_whitespace_arg():
 
 
 def get_preprocessors(format_name):
-    common_formatters = (
-        override_missing_value,
-        convert_to_string,
-        truncate_string,
-        style_output,
-    )
+    common_formatters = (override_missing_value, convert_to_display_string)
 
     if tabulate.multiline_formats.get(format_name):
-        return common_formatters + (style_output_table(format_name),)
+        # wrapped values span several lines, so they are not truncated
+        return common_formatters + (wrap_string, truncate_string, style_output)
     else:
-        return common_formatters + (escape_newlines, style_output_table(format_name))
+        return common_formatters + (truncate_string, style_output, escape_newlines)
 
 
 def style_output_table(format_name=""):
-    def style_output(
-        data,
-        headers,
-        style=None,
-        table_separator_token=Token.Output.TableSeparator,
-        **_,
-    ):
-        """Style the *table* a(e.g. bold, italic, and colors)
-
-        .. NOTE::
-            This requires the `Pygments <http://pygments.org/>`_ library to
-            be installed. You can install it with CLI Helpers as an extra::
-                $ pip install cli_helpers[styles]
-
-        Example usage::
-
-            from cli_helpers.tabular_output import tabulate_adapter
-            from pygments.style import Style
-            from pygments.token import Token
-
-            class YourStyle(Style):
-                default_style = ""
-                styles = {
-                    Token.Output.TableSeparator: '#ansigray'
-                }
-
-            headers = ('First Name', 'Last Name')
-            data = [['Fred', 'Roberts'], ['George', 'Smith']]
-            style_output_table = tabulate_adapter.style_output_table('psql')
-            style_output_table(data, headers, style=CliStyle)
-
-            data, headers = style_output(data, headers, style=YourStyle)
-            output = tabulate_adapter.adapter(data, headers, style=YourStyle)
-
-        :param iterable data: An :term:`iterable` (e.g. list) of rows.
-        :param iterable headers: The column headers.
-        :param str/pygments.style.Style style: A Pygments style. You can `create
-        your own styles <https://pygments.org/docs/styles#creating-own-styles>`_.
-        :param str table_separator_token: The token type to be used for the table separator.
-        :return: data and headers.
-        :rtype: tuple
-
-        """
-        if style and HAS_PYGMENTS and format_name in supported_table_formats:
-            if "truecolor" in os.getenv("COLORTERM", "").lower():
-                formatter = TerminalTrueColorFormatter(style=style)
-            else:
-                formatter = Terminal256Formatter(style=style)
-
-            def style_field(token, field):
-                """Get the styled text for a *field* using *token* type."""
-                s = StringIO()
-                formatter.format(((token, field),), s)
-                return s.getvalue()
-
-            def addColorInElt(elt):
-                if not elt:
-                    return elt
-                if elt.__class__ == tabulate.Line:
-                    return tabulate.Line(
-                        *(style_field(table_separator_token, val) for val in elt)
-                    )
-                if elt.__class__ == tabulate.DataRow:
-                    return tabulate.DataRow(
-                        *(style_field(table_separator_token, val) for val in elt)
-                    )
-                return elt
-
-            srcfmt = tabulate._table_formats[format_name]
-            newfmt = tabulate.TableFormat(*(addColorInElt(val) for val in srcfmt))
-            tabulate._table_formats[format_name] = newfmt
-
-        return iter(data), headers
+    """Get a preprocessor that used to style the table separators.
+
+    The table separators are now styled by :func:`adapter` (see
+    :func:`get_table_format`), so the preprocessor leaves the data and
+    headers unchanged. It is kept for compatibility.
+
+    """
+
+    @pipeline.preprocessor(noop_unless=("style",), headers=False)
+    def style_output(data, headers, **_):
+        return data, headers
 
     return style_output
 
 
-def adapter(data, headers, table_format=None, preserve_whitespace=False, **kwargs):
-    """Wrap tabulate inside a function for TabularOutputFormatter."""
+def get_table_format(
+    format_name, style=None, table_separator_token=Token.Output.TableSeparator
+):
+    """Get the tabulate table format *format_name*, styled with *style*.
+
+    Styled table formats are built once per format, style, token and color
+    depth (see :func:`~cli_helpers.utils.is_truecolor`), and tabulate's own
+    table formats are never changed.
+
+    .. NOTE::
+        Styling requires the `Pygments <http://pygments.org/>`_ library to
+        be installed. You can install it with CLI Helpers as an extra::
+            $ pip install cli_helpers[styles]
+
+    Example usage::
+
+        from cli_helpers.tabular_output import tabulate_adapter
+        from pygments.style import Style
+        from pygments.token import Token
+
+        class YourStyle(Style):
+            default_style = ""
+            styles = {
+                Token.Output.TableSeparator: '#ansigray'
+            }
+
+        table_format = tabulate_adapter.get_table_format('psql', YourStyle)
+
+    :param str format_name: The name of the table format.
+    :param str/pygments.style.Style style: A Pygments style. You can `create
+    your own styles <https://pygments.org/docs/styles#creating-own-styles>`_.
+    :param str table_separator_token: The token type to be used for the table separator.
+    :return: The (styled) table format.
+    :rtype: tabulate.TableFormat
+
+    """
+    if style and HAS_PYGMENTS and format_name in supported_table_formats:
+        return _get_styled_table_format(
+            format_name, style, table_separator_token, is_truecolor()
+        )
+    return tabulate._table_formats[format_name]
+
+
+@lru_cache(maxsize=None)
+def _get_styled_table_format(format_name, style, table_separator_token, truecolor):
+    prefix, suffix = get_style_codes(table_separator_token, style, truecolor)
+
+    def style_element(elt):
+        if isinstance(elt, (tabulate.Line, tabulate.DataRow)):
+            return elt.__class__(*(apply_style_codes(v, prefix, suffix) for v in elt))
+        return elt
+
+    srcfmt = tabulate._table_formats[format_name]
+    return tabulate.TableFormat(*(style_element(elt) for elt in srcfmt))
+
+
+def _is_styled(format_name, table_format):
+    """Check if *table_format* is a styled copy of tabulate's *format_name*."""
+    return (
+        table_format is not None
+        and tabulate._table_formats.get(format_name) is not table_format
+    )
+
+
+def _has_newlines(rows, headers):
+    return any("\n" in str(h) or "\r" in str(h) for h in headers) or any(
+        "\n" in v or "\r" in v for row in rows for v in row if isinstance(v, str)
+    )
+
+
+def _get_tablefmt(format_name, table_format, rows, headers):
+    """Get the ``tablefmt`` that renders *rows* as *table_format* in tabulate.
+
+    Styled table formats are passed to tabulate as they are. Tabulate only
+    lays out multiline cells for the table formats it knows by name, though,
+    so tables with multiline cells that :mod:`.aligned_table` cannot lay
+    out (e.g. with multiline headers) are rendered with the unstyled format.
+
+    """
+    if not _is_styled(format_name, table_format):
+        return format_name
+    if tabulate.multiline_formats.get(format_name) and _has_newlines(rows, headers):
+        return format_name
+    return table_format
+
+
+@pipeline.preprocessor(column_types=int_types + float_types)
+def adapter(
+    data,
+    headers,
+    table_format=None,
+    preserve_whitespace=False,
+    style=None,
+    row_style_mode="field",
+    table_separator_token=Token.Output.TableSeparator,
+    column_types=None,
+    sample_size=None,
+    column_widths=None,
+    window_size=None,
+    max_cell_lines=None,
+    **kwargs
+):
+    """Wrap tabulate inside a function for TabularOutputFormatter.
+
+    With ``row_style_mode='line'``, runs of table separators styled with
+    the same escape sequences are merged.
+
+    If *column_types* are given, they decide the alignment of the columns,
+    and tabulate only looks for numbers in numeric columns.
+
+    The box formats (see :data:`streaming_table_formats`) can be rendered
+    with fixed column widths: they are decided from the first *sample_size*
+    rows, or given with *column_widths*. The rows after the sample are
+    rendered as they are read, so tables of any length are output in
+    constant memory. Newlines are escaped, and cells that are too wide for
+    their column are truncated (numbers are shown as ``###``).
+
+    Alternatively, the box formats can be laid out in windows of
+    *window_size* rows. Each window gets the column widths it needs, and
+    the header is repeated whenever the layout changes, like a pager
+    showing one screen at a time. (When formatting with
+    :class:`~cli_helpers.tabular_output.TabularOutputFormatter`, the column
+    types are inferred from the first window, unless a *sample_size* is
+    given.)
+
+    For the box formats that support multiline cells, *max_cell_lines*
+    caps the lines shown per cell; the remaining lines are replaced by a
+    line like ``[+3 lines]``.
+
+    """
     keys = (
         "floatfmt",
         "numalign",
@@ -271,6 +359,176 @@ def adapter(data, headers, table_format=None, preserve_whitespace=False, **kwarg
         tabulate.PRESERVE_WHITESPACE = preserve_whitespace
 
     tkwargs.update(default_kwargs.get(table_format, {}))
+    if column_types is not None and "showindex" not in tkwargs:
+        _apply_column_types(tkwargs, column_types)
     if table_format in headless_formats:
         headers = []
-    return iter(tabulate.tabulate(data, headers, **tkwargs).split("\n"))
+    if table_format in supported_formats:
+        fmt = get_table_format(table_format, style, table_separator_token)
+    else:
+        fmt = None
+    lines = None
+    if "showindex" in tkwargs:
+        pass
+    elif table_format in markup_table.supported_formats:
+        if sample_size is None and not isinstance(data, list):
+            data = list(data)
+        sample, data = sample_rows(data, sample_size)
+        lines = _render_markup(sample, data, headers, table_format, tkwargs)
+    elif table_format not in streaming_table_formats:
+        layout_kwargs = _get_layout_kwargs(tkwargs, preserve_whitespace, max_cell_lines)
+        if _is_styled(table_format, fmt) and layout_kwargs["multiline"]:
+            # tabulate can't lay out the multiline cells of styled formats
+            data = data if isinstance(data, list) else list(data)
+            layout = aligned_table.get_layout(data, headers, **layout_kwargs)
+            if layout is not None and layout.multiline:
+                lines = aligned_table.render(
+                    data, headers, fmt, layout, preserve_whitespace=preserve_whitespace
+                )
+    elif window_size:
+        layout_kwargs = _get_layout_kwargs(tkwargs, preserve_whitespace, max_cell_lines)
+        lines = _render_windows(
+            data, headers, table_format, fmt, window_size, layout_kwargs, tkwargs
+        )
+    else:
+        fixed = sample_size is not None or column_widths is not None
+        if fixed:
+            escape = get_escaper(NEWLINE_ESCAPES)
+            data = ([_escape_cell(v, escape) for v in row] for row in data)
+            sample, data = sample_rows(data, sample_size or fixed_sample_size)
+        else:
+            sample = data = data if isinstance(data, list) else list(data)
+        layout = aligned_table.get_layout(
+            sample,
+            headers,
+            **_get_layout_kwargs(tkwargs, preserve_whitespace, max_cell_lines)
+        )
+        if layout is not None:
+            if fixed:
+                layout = aligned_table.fix_layout(layout, column_widths)
+            lines = aligned_table.render(
+                data, headers, fmt, layout, preserve_whitespace=preserve_whitespace
+            )
+    if lines is None:
+        lines = _tabulate_lines(data, headers, table_format, fmt, tkwargs)
+    if style and HAS_PYGMENTS and row_style_mode == "line":
+        prefix, suffix = get_style_codes(table_separator_token, style)
+        return (merge_style_codes(line, prefix, suffix) for line in lines)
+    return lines
+
+
+def _apply_column_types(tkwargs, column_types):
+    """Turn *column_types* into tabulate alignments and number parsing flags."""
+    if tkwargs.get("disable_numparse") is True:
+        # all the columns are text, like in tabulate
+        return
+    numeric = [t in int_types + float_types for t in column_types]
+    if "disable_numparse" not in tkwargs:
+        tkwargs["disable_numparse"] = [i for i, n in enumerate(numeric) if not n]
+
+    colalign = tkwargs.get("colalign") or ()
+    if isinstance(colalign, str):
+        return
+    aligns = [
+        tkwargs.get("numalign", "decimal") if n else tkwargs.get("stralign", "left")
+        for n in numeric
+    ]
+    for i, align in enumerate(colalign):
+        if i < len(aligns) and align != "global":
+            aligns[i] = align
+    tkwargs["colalign"] = aligns
+
+
+def _render_markup(sample, data, headers, table_format, tkwargs):
+    """Render a markup table row by row, with the column types of *sample*."""
+    floatfmt = tkwargs.get("floatfmt", tabulate._DEFAULT_FLOATFMT)
+    colalign = tkwargs.get("colalign") or ()
+    if not (sample and headers and isinstance(floatfmt, str)):
+        return None
+    if isinstance(colalign, str) or any(colalign):
+        return None
+    column_types = aligned_table.get_column_types(
+        sample, headers, tkwargs.get("disable_numparse", False)
+    )
+    if column_types is None:
+        return None
+    types, has_invisible, has_newlines = column_types
+    if has_newlines and tabulate.multiline_formats.get(table_format):
+        return None
+    return markup_table.render(
+        data, headers, table_format, types, floatfmt, has_invisible
+    )
+
+
+def _align_text_right(rows, colalign):
+    """Right align the decimal aligned columns of *rows* that contain text.
+
+    Tabulate pads text (e.g. a missing value) in a decimal aligned column
+    as if it were a whole number, which widens the column.
+
+    """
+    aligns = list(colalign)
+    for i, align in enumerate(aligns):
+        if align == "decimal" and not all(
+            aligned_table.is_number(row[i]) for row in rows if i < len(row)
+        ):
+            aligns[i] = "right"
+    return aligns
+
+
+def _tabulate_lines(data, headers, table_format, fmt, tkwargs):
+    """Render the table with tabulate."""
+    data = data if isinstance(data, list) else list(data)
+    colalign = tkwargs.get("colalign")
+    if isinstance(colalign, list) and "decimal" in colalign:
+        tkwargs = dict(tkwargs, colalign=_align_text_right(data, colalign))
+    tablefmt = _get_tablefmt(table_format, fmt, data, headers)
+    table = tabulate.tabulate(data, headers, **dict(tkwargs, tablefmt=tablefmt))
+    return iter(table.split("\n"))
+
+
+def _render_windows(
+    data, headers, table_format, fmt, window_size, layout_kwargs, tkwargs
+):
+    """Render the table in windows of *window_size* rows."""
+    preserve_whitespace = layout_kwargs["preserve_whitespace"]
+    data = iter(data)
+    layout = None
+    rendered = False
+    for window in iter(lambda: list(islice(data, window_size)), []):
+        new_layout = aligned_table.get_layout(window, headers, **layout_kwargs)
+        if layout is not None and new_layout != layout:
+            yield from aligned_table.render_footer(fmt, layout)
+        if new_layout is None:
+            yield from _tabulate_lines(window, headers, table_format, fmt, tkwargs)
+        else:
+            continued = new_layout == layout
+            if not continued:
+                yield from aligned_table.render_header(headers, fmt, new_layout)
+            yield from aligned_table.render_rows(
+                window, fmt, new_layout, preserve_whitespace, continued
+            )
+        layout = new_layout
+        rendered = True
+    if layout is not None:
+        yield from aligned_table.render_footer(fmt, layout)
+    elif not rendered:
+        yield from _tabulate_lines([], headers, table_format, fmt, tkwargs)
+
+
+def _escape_cell(value, escape):
+    return escape(value) if isinstance(value, str) else value
+
+
+def _get_layout_kwargs(tkwargs, preserve_whitespace, max_cell_lines):
+    """Get the :func:`aligned_table.get_layout` arguments for tabulate's."""
+    return {
+        "numalign": tkwargs.get("numalign", "decimal"),
+        "stralign": tkwargs.get("stralign", "left"),
+        "colalign": tkwargs.get("colalign"),
+        "floatfmt": tkwargs.get("floatfmt", tabulate._DEFAULT_FLOATFMT),
+        "disable_numparse": tkwargs.get("disable_numparse", False),
+        "preserve_whitespace": preserve_whitespace,
+        "multiline": bool(tabulate.multiline_formats.get(tkwargs["tablefmt"])),
+        "max_lines": max_cell_lines,
+    }
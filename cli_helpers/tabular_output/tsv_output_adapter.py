@@ -3,21 +3,83 @@
 
 from __future__ import unicode_literals
 
-from .preprocessors import bytes_to_string, override_missing_value, convert_to_string
+from . import pipeline
 from itertools import chain
-from cli_helpers.utils import replace
+from cli_helpers import utils
+from cli_helpers.compat import HAS_PYGMENTS, Token, binary_type, text_type
+from cli_helpers.utils import get_escaper, TSV_ESCAPES
 
 supported_formats = ("tsv", "tsv_noheader")
-preprocessors = (override_missing_value, bytes_to_string, convert_to_string)
+# missing values, binary data and strings are converted by the adapter
+preprocessors = ()
 
 
-def adapter(data, headers, table_format="tsv", **kwargs):
-    """Wrap the formatting inside a function for TabularOutputFormatter."""
-    if table_format == "tsv":
-        for row in chain((headers,), data):
-            yield "\t".join((replace(r, (("\n", r"\n"), ("\t", r"\t"))) for r in row))
-    elif table_format == "tsv_noheader":
-        for row in data:
-            yield "\t".join((replace(r, (("\n", r"\n"), ("\t", r"\t"))) for r in row))
-    else:
+@pipeline.preprocessor()
+def adapter(
+    data,
+    headers,
+    table_format="tsv",
+    column_types=None,
+    missing_value="",
+    missing_value_token=Token.Output.Null,
+    style=None,
+    **kwargs,
+):
+    """Wrap the formatting inside a function for TabularOutputFormatter.
+
+    Missing values are replaced, binary data is decoded, and the fields are
+    converted to strings and escaped in a single pass over each row. Rows of
+    text columns (see *column_types*, or the types in the first row) that
+    need no escaping are joined as they are.
+
+    """
+    if table_format not in supported_formats:
         raise ValueError(f"Invalid table_format specified: {table_format}.")
+    if style and HAS_PYGMENTS:
+        missing_value = utils.style_field(missing_value_token, missing_value, style)
+
+    if table_format == "tsv":
+        escape = get_escaper(TSV_ESCAPES)
+        yield "\t".join([escape(utils.to_string(h)) for h in headers])
+
+    data = iter(data)
+    if column_types is None:
+        first = next(data, None)
+        if first is None:
+            return
+        column_types = [type(v) for v in first]
+        data = chain((first,), data)
+    format_row = _get_row_formatter(column_types, missing_value)
+    yield from map(format_row, data)
+
+
+def _is_clean(line, row):
+    """Check if *line*, joined from the strings in *row*, needs no escaping."""
+    return "\n" not in line and line.count("\t") == len(row) - 1
+
+
+def _get_row_formatter(column_types, missing_value):
+    """Get a function that formats a row as a line of tab separated values."""
+    escape = get_escaper(TSV_ESCAPES)
+
+    def format_any_row(row):
+        if None in row:
+            row = [missing_value if v is None else v for v in row]
+        if binary_type in map(type, row):
+            row = [utils.to_string(v) for v in row]
+        row = list(map(text_type, row))
+        line = "\t".join(row)
+        return line if _is_clean(line, row) else "\t".join(map(escape, row))
+
+    if any(t is not text_type for t in column_types):
+        return format_any_row
+
+    def format_text_row(row):
+        try:
+            line = "\t".join(row)
+        except TypeError:
+            # e.g. a missing value
+            return format_any_row(row)
+        return line if _is_clean(line, row) else "\t".join(map(escape, row))
+
+    return format_text_row
@@ -2,32 +2,46 @@
 """Format data into a vertical table layout."""
 
 from __future__ import unicode_literals
+from operator import add
 
 from cli_helpers.utils import filter_dict_by_key
+from . import pipeline
 from .preprocessors import convert_to_string, override_missing_value, style_output
 
 supported_formats = ("vertical",)
-preprocessors = (override_missing_value, convert_to_string, style_output)
 
 
-def _get_separator(num, sep_title, sep_character, sep_length):
-    """Get a row separator for row *num*."""
+@pipeline.preprocessor(noop_unless=("style",))
+def style_output_fields(data, headers, **kwargs):
+    """Style the *data* and *headers* one field at a time.
+
+    Every field is rendered on its own line in the vertical layout, so the
+    row style is always applied per field (see
+    :func:`~cli_helpers.tabular_output.preprocessors.style_output`).
+
+    """
+    kwargs["row_style_mode"] = "field"
+    return style_output(data, headers, **kwargs)
+
+
+preprocessors = (override_missing_value, convert_to_string, style_output_fields)
+
+
+def _get_separator_template(sep_title, sep_character, sep_length):
+    """Get a row separator template, in which only ``{n}`` is left to format."""
     left_divider_length = right_divider_length = sep_length
     if isinstance(sep_length, tuple):
         left_divider_length, right_divider_length = sep_length
-    left_divider = sep_character * left_divider_length
-    right_divider = sep_character * right_divider_length
-    title = sep_title.format(n=num + 1)
+    left_divider = _escape_braces(sep_character * left_divider_length)
+    right_divider = _escape_braces(sep_character * right_divider_length)
 
     return "{left_divider}[ {title} ]{right_divider}\n".format(
-        left_divider=left_divider, right_divider=right_divider, title=title
+        left_divider=left_divider, right_divider=right_divider, title=sep_title
     )
 
 
-def _format_row(headers, row):
-    """Format a row."""
-    formatted_row = [" | ".join(field) for field in zip(headers, row)]
-    return "\n".join(formatted_row)
+def _escape_braces(s):
+    return s.replace("{", "{{").replace("}", "}}")
 
 
 def vertical_table(
@@ -48,19 +62,20 @@ def vertical_table(
                                  appear on each side of the *sep_title*. Use
                                  a tuple to specify the left and right values
                                  separately.
-    :return: The formatted data.
-    :rtype: str
+    :return: The formatted records, one at a time.
+    :rtype: iterator
 
     """
     header_len = max([len(x) for x in headers])
-    padded_headers = [x.ljust(header_len) for x in headers]
-    formatted_rows = [_format_row(padded_headers, row) for row in data]
+    # each field line is its padded header and separator, then the value
+    prefixes = [x.ljust(header_len) + " | " for x in headers]
+    separator = _get_separator_template(sep_title, sep_character, sep_length)
 
-    output = []
-    for i, result in enumerate(formatted_rows):
-        yield _get_separator(i, sep_title, sep_character, sep_length) + result
+    for i, row in enumerate(data, 1):
+        yield separator.format(n=i) + "\n".join(map(add, prefixes, row))
 
 
+@pipeline.preprocessor()
 def adapter(data, headers, **kwargs):
     """Wrap vertical table in a function for TabularOutputFormatter."""
     keys = ("sep_title", "sep_character", "sep_length")
@@ -2,9 +2,12 @@
 """Various utility functions and helpers."""
 
 import binascii
+import codecs
 import os
 import re
+from datetime import datetime
 from functools import lru_cache
+from itertools import chain, islice
 from typing import Dict, Tuple, Union
 
 from typing import TYPE_CHECKING
@@ -18,19 +21,28 @@ from cli_helpers.compat import (
     Terminal256Formatter,
     TerminalTrueColorFormatter,
     StringIO,
+    wcswidth,
+    wcwidth,
 )
 
 
-def bytes_to_string(b):
+def bytes_to_string(b, max_width=None):
     """Convert bytes *b* to a string.
 
     Hexlify bytes that can't be decoded.
 
+    With *max_width*, long values are previewed: only the leading bytes
+    needed to display *max_width* characters are decoded (or hexlified), and
+    whether to hexlify is decided on those bytes alone. The preview is still
+    longer than *max_width*, so it is truncated like the full value would be.
+
     """
     if isinstance(b, binary_type):
+        if max_width is not None and len(b) > 4 * (max_width + 2):
+            return _preview_bytes(memoryview(b), max_width)
         needs_hex = False
         try:
-            result = b.decode("utf8")
+            result = b.decode("ascii" if b.isascii() else "utf8")
             needs_hex = not result.isprintable()
         except UnicodeDecodeError:
             needs_hex = True
@@ -41,6 +53,18 @@ def bytes_to_string(b):
     return b
 
 
+def _preview_bytes(view, max_width):
+    """Convert the leading bytes of memoryview *view* to a string."""
+    try:
+        # a character cut off at the end of the slice is left undecoded
+        result, _ = codecs.utf_8_decode(view[: 4 * (max_width + 2)], "strict", False)
+        if result.isprintable():
+            return result
+    except UnicodeDecodeError:
+        pass
+    return "0x" + binascii.hexlify(view[: max_width // 2 + 1]).decode("ascii")
+
+
 def to_hex_if_bin(b):
     """Convert bytes *b* to a string.
 
@@ -52,10 +76,14 @@ def to_hex_if_bin(b):
     return b
 
 
-def to_string(value):
-    """Convert *value* to a string."""
+def to_string(value, max_width=None):
+    """Convert *value* to a string.
+
+    See :func:`bytes_to_string` for *max_width*.
+
+    """
     if isinstance(value, binary_type):
-        return bytes_to_string(value)
+        return bytes_to_string(value, max_width)
     else:
         return text_type(value)
 
@@ -73,19 +101,139 @@ def to_undecoded_string(value):
         return text_type(value)
 
 
+def display_width(value):
+    """Get the number of terminal columns needed to display the string *value*.
+
+    ANSI escape sequences take no space, and wide (e.g. East Asian)
+    characters take two columns. ASCII strings are measured with
+    :func:`len`; the widths of other short strings are cached.
+
+    """
+    if value.isascii():
+        if "\x1b" in value:
+            return len(strip_ansi(value))
+        return len(value)
+    elif len(value) > _max_cached_width_length:
+        # not cached, so the cache never keeps long values alive
+        return _display_width(value)
+    return _cached_display_width(value)
+
+
+# the length of the longest string whose display width is cached
+_max_cached_width_length = 256
+
+
+def _display_width(value):
+    if "\x1b" in value:
+        value = strip_ansi(value)
+    if wcswidth is None:
+        return len(value)
+    width = wcswidth(value)
+    return len(value) if width < 0 else width
+
+
+_cached_display_width = lru_cache(maxsize=4096)(_display_width)
+
+
+def _truncate_to_width(value, width):
+    """Get the longest prefix of *value* that fits in *width* columns."""
+    if wcwidth is None:
+        return value[:width]
+    total = 0
+    for i, char in enumerate(value):
+        total += max(wcwidth(char), 0)
+        if total > width:
+            return value[:i]
+    return value
+
+
 def truncate_string(value, max_width=None, skip_multiline_string=True):
-    """Truncate string values."""
-    if skip_multiline_string and isinstance(value, text_type) and "\n" in value:
+    """Truncate string values to *max_width* display columns."""
+    if not isinstance(value, text_type) or max_width is None:
         return value
-    elif (
-        isinstance(value, text_type)
-        and max_width is not None
-        and len(value) > max_width
-    ):
-        return value[: max_width - 3] + "..."
+    elif skip_multiline_string and "\n" in value:
+        return value
+    elif value.isascii():
+        if len(value) > max_width:
+            return value[: max_width - 3] + "..."
+    elif len(value) * 2 > max_width and display_width(value) > max_width:
+        return _truncate_to_width(value, max_width - 3) + "..."
     return value
 
 
+_wrap_tokens_re = re.compile(r"\S+|\s+")
+
+
+def wrap_string(value, width=None):
+    """Wrap the string *value* into lines of at most *width* display columns.
+
+    Lines are broken at whitespace where possible, and words wider than
+    *width* are split. Existing newlines are kept. Short values are cached,
+    so re-wrapping them (e.g. when re-rendering a table) is cheap.
+
+    """
+    if not isinstance(value, text_type) or not width or width < 1:
+        return value
+    if value.isascii() and "\x1b" not in value and len(value) <= width:
+        return value
+    elif len(value) > _max_cached_width_length:
+        # not cached, so the cache never keeps long values alive
+        return _wrap_string(value, width)
+    return _cached_wrap_string(value, width)
+
+
+def _wrap_string(value, width):
+    return "\n".join(
+        line for paragraph in value.split("\n") for line in _wrap_line(paragraph, width)
+    )
+
+
+_cached_wrap_string = lru_cache(maxsize=4096)(_wrap_string)
+
+
+def _wrap_line(text, width):
+    """Wrap the single line *text* (see :func:`wrap_string`)."""
+    if display_width(text) <= width:
+        return [text]
+    lines = []
+    line, line_width = "", 0
+    for token in _wrap_tokens_re.findall(text):
+        token_width = display_width(token)
+        if line_width + token_width <= width:
+            line += token
+            line_width += token_width
+            continue
+        if line.strip():
+            lines.append(line.rstrip())
+        line, line_width = "", 0
+        if token.isspace():
+            continue
+        while token_width > width:
+            head = _truncate_to_width(token, width) or token[0]
+            lines.append(head)
+            token = token[len(head) :]
+            token_width = display_width(token)
+        line, line_width = token, token_width
+    if line:
+        lines.append(line.rstrip())
+    return lines
+
+
+@lru_cache(maxsize=1024)
+def format_timestamp(value, date_format):
+    """Format the ISO 8601 string *value* using the strftime *date_format*.
+
+    Values that are not timestamps are returned unchanged. Results are
+    cached, as timestamp columns tend to repeat values.
+
+    """
+    try:
+        return datetime.fromisoformat(value).strftime(date_format)
+    except (ValueError, TypeError):
+        # not a date
+        return value
+
+
 def intlen(n):
     """Find the length of the integer part of a number *n*."""
     pos = n.find(".")
@@ -106,11 +254,50 @@ def unique_items(seq):
 _ansi_re = re.compile("\033\\[((?:\\d|;)*)([a-zA-Z])")
 
 
+def sample_rows(data, size=None):
+    """Read a sample of up to *size* rows from the iterable *data*.
+
+    When *size* is :data:`None`, all of *data* is read.
+
+    :return: The sample (a :class:`list`) and an iterator over all rows,
+             including the sampled ones.
+    :rtype: tuple
+
+    """
+    data = iter(data)
+    sample = list(data) if size is None else list(islice(data, size))
+    return sample, chain(sample, data)
+
+
 def strip_ansi(value):
     """Strip the ANSI escape sequences from a string."""
     return _ansi_re.sub("", value)
 
 
+NEWLINE_ESCAPES = (("\r", r"\r"), ("\n", r"\n"))
+TSV_ESCAPES = (("\n", r"\n"), ("\t", r"\t"))
+
+
+@lru_cache()
+def get_escaper(replacements):
+    """Get a function that escapes characters in a string.
+
+    *replacements* is a :class:`tuple` of ``(character, replacement)`` pairs,
+    so several escaping steps can be fused into a single function. Each
+    character is looked for before anything is replaced, which keeps the
+    common case of a string without special characters cheap.
+
+    """
+
+    def escape(value):
+        for char, replacement in replacements:
+            if char in value:
+                value = value.replace(char, replacement)
+        return value
+
+    return escape
+
+
 def replace(s, replace):
     """Replace multiple values in a string"""
     for r in replace:
@@ -118,20 +305,119 @@ def replace(s, replace):
     return s
 
 
+def is_truecolor():
+    """Check if the terminal supports 24-bit (true color) escape sequences."""
+    return "truecolor" in os.getenv("COLORTERM", "").lower()
+
+
 @lru_cache()
-def _get_formatter(style) -> Union[Terminal256Formatter, TerminalTrueColorFormatter]:
-    if "truecolor" in os.getenv("COLORTERM", "").lower():
+def _get_formatter(
+    style, truecolor=False
+) -> Union[Terminal256Formatter, TerminalTrueColorFormatter]:
+    if truecolor:
         return TerminalTrueColorFormatter(style=style)
     else:
         return Terminal256Formatter(style=style)
 
 
+@lru_cache()
+def _get_style_codes(token, formatter) -> Tuple[str, str]:
+    s = StringIO()
+    formatter.format(((token, "\0"),), s)
+    prefix, _, suffix = s.getvalue().partition("\0")
+    return prefix, suffix
+
+
+def get_style_codes(token, style, truecolor=None) -> Tuple[str, str]:
+    """Get the escape sequences used to style *token* as a (prefix, suffix) pair.
+
+    The pair is resolved once per style (and formatter), so styling a field
+    is plain string concatenation afterwards.
+
+    :param bool truecolor: Whether to use 24-bit color escape sequences. By
+                           default, this is read from ``$COLORTERM``.
+
+    """
+    if truecolor is None:
+        truecolor = is_truecolor()
+    return _get_style_codes(token, _get_formatter(style, truecolor))
+
+
+def apply_style_codes(field, prefix, suffix):
+    """Wrap *field* in the *prefix* and *suffix* escape sequences.
+
+    Like Pygments' terminal formatters, the style is reset at each newline
+    and empty lines are left unstyled.
+
+    """
+    if "\n" in field:
+        return "\n".join(
+            prefix + line + suffix if line else line for line in field.split("\n")
+        )
+    return prefix + field + suffix if field else field
+
+
+def apply_row_style_codes(row, prefix, suffix, reopen=False):
+    """Wrap a whole single-line *row* in one *prefix*/*suffix* pair.
+
+    The prefix opens the first field and the suffix closes the last one, so
+    the rendered line (column separators included) carries a single pair of
+    escape sequences. Fields that already contain escape sequences re-open
+    the row style after themselves. Use *reopen* to also re-open it at the
+    start of every field, e.g. when the column separators are styled
+    themselves.
+
+    """
+    if not row:
+        return row
+    row = [field + prefix if "\x1b" in field else field for field in row]
+    if reopen:
+        row = [prefix + field for field in row]
+    else:
+        row[0] = prefix + row[0]
+    row[-1] = row[-1] + suffix
+    return row
+
+
+def merge_style_codes(value, prefix, suffix):
+    """Merge adjacent runs styled with the same *prefix*/*suffix* pair.
+
+    ``suffix + prefix`` between two runs of the same style is a no-op for the
+    terminal, so it is dropped. It is kept after runs of other styles that
+    happen to end with the same *suffix*.
+
+    """
+    if not (prefix and suffix) or suffix + prefix not in value:
+        return value
+    parts = value.split(suffix + prefix)
+    merged = [parts[0]]
+    # whether the run that is open at the end of the last part is *prefix*'s
+    in_run = _ends_in_run(parts[0], prefix, False)
+    for part in parts[1:]:
+        if not in_run:
+            merged.append(suffix + prefix)
+        merged.append(part)
+        in_run = _ends_in_run(part, prefix, True)
+    return "".join(merged)
+
+
+def _ends_in_run(text, prefix, in_run):
+    """Check if the run open at the end of *text* was opened by *prefix*.
+
+    *in_run* tells whether a *prefix* run is open at the start of *text*.
+
+    """
+    end = None
+    for match in _ansi_re.finditer(text):
+        end = match.end()
+    if end is None:
+        return in_run
+    return text[:end].endswith(prefix)
+
+
 def style_field(token, field, style):
     """Get the styled text for a *field* using *token* type."""
-    formatter = _get_formatter(style)
-    s = StringIO()
-    formatter.format(((token, field),), s)
-    return s.getvalue()
+    return apply_style_codes(field, *get_style_codes(token, style))
 
 
 def filter_style_table(style: "StyleMeta", *relevant_styles: str) -> Dict:
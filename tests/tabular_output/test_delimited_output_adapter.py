@@ -2,6 +2,8 @@
 """Test the delimited output adapter."""
 
 from __future__ import unicode_literals
+import csv
+from io import StringIO
 from textwrap import dedent
 
 import pytest
@@ -83,3 +85,42 @@ def test_unicode_with_csv():
         观音,1\n\
         Ποσειδῶν,456"""
     )
+
+
+def test_csv_batches():
+    """Test that batches of rows are joined into blocks of lines."""
+    data = [["abc", "1"], ["d,e", "456"], ['"f"', "7\n8"]]
+    headers = ["letters", "number"]
+    output = list(delimited_output_adapter.adapter(iter(data), headers, batch_size=2))
+    assert output == ["letters,number", 'abc,1\n"d,e",456', '"""f""",7\n8']
+    assert "\n".join(output) == "\n".join(
+        delimited_output_adapter.adapter(iter(data), headers)
+    )
+
+
+@pytest.mark.parametrize(
+    "dialect_kwargs",
+    [
+        {},
+        {"dialect": "excel-tab"},
+        {"quoting": csv.QUOTE_ALL, "quotechar": "'"},
+        {"quoting": csv.QUOTE_NONNUMERIC},
+        {"quoting": csv.QUOTE_NONE, "escapechar": "\\"},
+        {"doublequote": False, "escapechar": "\\", "skipinitialspace": True},
+    ],
+)
+def test_csv_matches_csv_writer(dialect_kwargs):
+    """Test that the rows are written like csv.writer writes them."""
+    data = [["a b", 1, 2.5], ["c,d", None, ""], ["'e'", '"f"', "g\\h"]]
+    expected = []
+    for row in data:
+        buffer = StringIO()
+        csv.writer(buffer, delimiter=",", lineterminator="", **dialect_kwargs).writerow(
+            row
+        )
+        expected.append(buffer.getvalue())
+
+    output = delimited_output_adapter.adapter(
+        iter(data), ["x", "y", "z"], table_format="csv-noheader", **dialect_kwargs
+    )
+    assert list(output) == expected
@@ -3,8 +3,13 @@
 
 from __future__ import unicode_literals
 
+from datetime import date, datetime
 from decimal import Decimal
+from uuid import UUID
 
+import pytest
+
+from cli_helpers.compat import orjson
 from cli_helpers.tabular_output import json_output_adapter
 
 
@@ -62,3 +67,104 @@ def test_unicode_with_jsonl_esc():
         "\n".join(output)
         == """{"letters":"\\u89c2\\u97f3","number":1}\n{"letters":"\\u03a0\\u03bf\\u03c3\\u03b5\\u03b9\\u03b4\\u1ff6\\u03bd","number":456}"""
     )
+
+
+def test_jsonl_column_types():
+    """Test that values that don't match their column type are encoded."""
+    data = [[1, "a", 2.5], [None, 2, True], [float("nan"), ["b"], Decimal("0.5")]]
+    headers = ["x", "y", "z"]
+    output = json_output_adapter.adapter(
+        iter(data), headers, table_format="jsonl", column_types=[int, str, float]
+    )
+    assert list(output) == [
+        '{"x":1,"y":"a","z":2.5}',
+        '{"x":null,"y":2,"z":true}',
+        '{"x":NaN,"y":["b"],"z":0.5}',
+    ]
+
+
+def test_jsonl_duplicate_headers():
+    """Test that later values replace earlier ones with duplicate headers."""
+    data = [[1, 2, 3]]
+    output = json_output_adapter.adapter(iter(data), ["a", "b", "a"])
+    assert list(output) == ['{"a":3,"b":2}']
+
+
+@pytest.mark.skipif(orjson is None, reason="requires orjson")
+def test_jsonl_orjson_backend():
+    """Test that the jsonl format can be encoded with orjson."""
+    data = [["观音", 1, Decimal("4.5"), None]]
+    headers = ["letters", "number", "decimal", "value"]
+    output = json_output_adapter.adapter(
+        iter(data), headers, table_format="jsonl", json_backend="orjson"
+    )
+    assert list(output) == ['{"letters":"观音","number":1,"decimal":4.5,"value":null}']
+
+
+def test_json_array():
+    """Test that the json format outputs an array of objects, row by row."""
+    data = [["观音", 1], ["d", Decimal("4.5")]]
+    headers = ["letters", "number"]
+    output = json_output_adapter.adapter(iter(data), headers, table_format="json")
+    assert list(output) == [
+        "[",
+        '{"letters":"观音","number":1},',
+        '{"letters":"d","number":4.5}',
+        "]",
+    ]
+
+
+def test_json_columns(monkeypatch):
+    """Test that the json_columns format outputs an array per column."""
+    monkeypatch.setattr(json_output_adapter, "column_spool_size", 8)
+    data = [["ab\r\nc", 1], ["d", None], ["e", 3]]
+    headers = ["letters", "number"]
+    output = json_output_adapter.adapter(
+        iter(data), headers, table_format="json_columns"
+    )
+    assert "".join(output) == ('{"letters":["ab\\r\\nc","d","e"],"number":[1,null,3]}')
+
+
+def test_jsonl_native_types():
+    """Test that dates, UUIDs, memoryviews and Decimals are encoded."""
+    data = [
+        [
+            datetime(2024, 5, 6, 7, 8, 9),
+            date(2024, 5, 6),
+            UUID(int=1),
+            memoryview(b"ab"),
+            Decimal("1.10"),
+        ]
+    ]
+    headers = ["datetime", "date", "uuid", "binary", "decimal"]
+    output = json_output_adapter.adapter(iter(data), headers, table_format="jsonl")
+    assert list(output) == [
+        '{"datetime":"2024-05-06T07:08:09","date":"2024-05-06",'
+        '"uuid":"00000000-0000-0000-0000-000000000001","binary":"ab",'
+        '"decimal":1.1}'
+    ]
+
+    output = json_output_adapter.adapter(
+        iter(data), headers, table_format="jsonl", exact_decimals=True
+    )
+    assert next(output).endswith(',"decimal":1.10}')
+
+
+def test_exact_decimals_in_containers():
+    """Test that exact_decimals applies to Decimal values in lists and dicts."""
+    data = [[[Decimal("1.10")], {"b": Decimal("2.50"), 1: [None, True]}]]
+    headers = ["list", "dict"]
+    expected = '{"list":[1.10],"dict":{"b":2.50,"1":[null,true]}}'
+
+    output = json_output_adapter.adapter(
+        iter(data), headers, table_format="jsonl", exact_decimals=True
+    )
+    assert list(output) == [expected]
+
+    output = json_output_adapter.adapter(
+        iter(data), headers, table_format="json_columns", exact_decimals=True
+    )
+    assert "".join(output) == '{"list":[[1.10]],"dict":[{"b":2.50,"1":[null,true]}]}'
+
+    output = json_output_adapter.adapter(iter(data), headers, table_format="jsonl")
+    assert list(output) == ['{"list":[1.1],"dict":{"b":2.5,"1":[null,true]}}']
@@ -4,6 +4,7 @@
 from __future__ import unicode_literals
 from decimal import Decimal
 from textwrap import dedent
+import itertools
 
 import pytest
 
@@ -212,6 +213,43 @@ def test_additional_preprocessors():
     )
 
 
+def test_streaming_format_output():
+    """Test that formats that don't need column types stream the data."""
+
+    def rows():
+        yield ["a", 1]
+        raise AssertionError("read past the first row")
+
+    output = TabularOutputFormatter().format_output(rows(), ["h1", "h2"], "csv")
+
+    assert next(output) == "h1,h2"
+    assert next(output) == "a,1"
+
+
+def test_windowed_format_output(monkeypatch):
+    """Test that the column types of a windowed table are inferred from the
+    first window only."""
+
+    def rows():
+        yield ["a", 1]
+        yield ["b", 22]
+        raise AssertionError("read past the first window")
+
+    formatter = TabularOutputFormatter()
+    # the formatter keeps the arguments of a format between calls
+    fkwargs = formatter._output_formats["psql"].formatter_args
+    monkeypatch.setitem(fkwargs, "window_size", 2)
+    output = formatter.format_output(rows(), ["h1", "h2"], "psql")
+
+    assert [next(output) for _ in range(5)] == [
+        "+----+----+",
+        "| h1 | h2 |",
+        "|----+----|",
+        "| a  |  1 |",
+        "| b  | 22 |",
+    ]
+
+
 def test_format_name_attribute():
     """Test the the format_name attribute be set and retrieved."""
     formatter = TabularOutputFormatter(format_name="plain")
@@ -348,3 +386,120 @@ def test_all_text_type(extra_kwargs):
             iter(data), headers, format_name=format_name, **extra_kwargs
         ):
             assert isinstance(row, text_type), "not unicode for {}".format(format_name)
+
+
+def test_tabular_output_column_types():
+    """Test that the column types decide the alignment of tabulate columns."""
+    data = [["1", 1], ["23", None]]
+    headers = ["text", "number"]
+    output = TabularOutputFormatter().format_output(
+        iter(data), headers, format_name="psql", missing_value="<null>"
+    )
+    assert "\n".join(output) == dedent(
+        """\
+        +------+--------+
+        | text | number |
+        |------+--------|
+        | 1    |      1 |
+        | 23   | <null> |
+        +------+--------+"""
+    )
+
+
+def test_fixed_column_widths_format_output(monkeypatch):
+    """Test that tables with fixed column widths are streamed."""
+    formatter = TabularOutputFormatter()
+    # the formatter keeps the arguments of a format between calls
+    fkwargs = formatter._output_formats["psql"].formatter_args
+    monkeypatch.setitem(fkwargs, "column_widths", [3, 4])
+    rows = (["abc", n] for n in itertools.count())
+    output = formatter.format_output(rows, ["h1", "h2"], "psql")
+
+    assert [next(output) for _ in range(5)] == [
+        "+-----+------+",
+        "| h1  |   h2 |",
+        "|-----+------|",
+        "| abc |    0 |",
+        "| abc |    1 |",
+    ]
+
+
+def test_tabular_output_disable_numparse(monkeypatch):
+    """Test that columns are aligned as text with disable_numparse."""
+    formatter = TabularOutputFormatter()
+    # the formatter keeps the arguments of a format between calls
+    fkwargs = formatter._output_formats["psql"].formatter_args
+    monkeypatch.setitem(fkwargs, "disable_numparse", True)
+    output = formatter.format_output([["a", 1], ["b", 22.5]], ["text", "n"], "psql")
+    assert "\n".join(output) == dedent(
+        """\
+        +------+------+
+        | text | n    |
+        |------+------|
+        | a    | 1    |
+        | b    | 22.5 |
+        +------+------+"""
+    )
+
+
+def test_tabular_output_missing_numbers():
+    """Test that missing values don't widen decimal aligned columns."""
+    data = [[1.5, 10], [None, None], [22.25, 3]]
+    headers = ["f", "d"]
+    output = TabularOutputFormatter().format_output(
+        iter(data), headers, format_name="psql", missing_value="<null>"
+    )
+    assert "\n".join(output) == dedent(
+        """\
+        +--------+--------+
+        |      f |      d |
+        |--------+--------|
+        |   1.5  |     10 |
+        | <null> | <null> |
+        |  22.25 |      3 |
+        +--------+--------+"""
+    )
+
+    output = TabularOutputFormatter().format_output(
+        iter(data), headers, format_name="simple", missing_value="<null>"
+    )
+    assert "\n".join(output) == dedent(
+        """\
+             f       d
+        ------  ------
+           1.5      10
+        <null>  <null>
+         22.25       3"""
+    )
+
+
+@pytest.mark.parametrize("format_name", ["csv", "tsv", "jsonl", "vertical"])
+def test_max_field_width_keeps_binary_data(format_name):
+    """Test that long binary values are only previewed in tabulate formats."""
+    blob = b"\xff" * 5000
+    output = "\n".join(
+        TabularOutputFormatter().format_output(
+            [[blob]], ["blob"], format_name=format_name, max_field_width=10
+        )
+    )
+    assert "ff" * 5000 in output
+
+
+def test_wrap_long_values(monkeypatch):
+    """Test that values longer than max_field_width are wrapped, not cut."""
+    formatter = TabularOutputFormatter()
+    # the formatter keeps the arguments of a format between calls
+    fkwargs = formatter._output_formats["psql"].formatter_args
+    monkeypatch.setitem(fkwargs, "max_field_width", 20)
+    monkeypatch.setitem(fkwargs, "max_col_width", 25)
+    output = formatter.format_output([["abcdefghij" * 6]], ["text"], "psql")
+    assert "\n".join(output) == dedent(
+        """\
+        +---------------------------+
+        | text                      |
+        |---------------------------|
+        | abcdefghijabcdefghijabcde |
+        | fghijabcdefghijabcdefghij |
+        | abcdefghij                |
+        +---------------------------+"""
+    )
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""Test the preprocessor declarations and planning."""
+
+from __future__ import unicode_literals
+
+from cli_helpers.tabular_output import pipeline
+from cli_helpers.tabular_output.preprocessors import (
+    align_decimals,
+    convert_to_string,
+    format_numbers,
+    style_output,
+)
+
+
+def test_preprocessor_info():
+    """Test that the preprocessor() decorator attaches its info."""
+
+    @pipeline.preprocessor(streaming=False, noop_unless=("foo",))
+    def foo(data, headers, **_):
+        return data, headers
+
+    assert pipeline.get_info(foo) == pipeline.PreprocessorInfo(
+        streaming=False, column_types=None, noop_unless=("foo",), headers=True
+    )
+    assert pipeline.get_info(lambda data, headers: (data, headers)) is None
+
+
+def test_plan_skips_noops():
+    """Test that plan() skips preprocessors that would do nothing."""
+    preprocessors = (convert_to_string, style_output, format_numbers)
+
+    assert pipeline.plan(preprocessors, {}) == (convert_to_string,)
+    assert pipeline.plan(preprocessors, {"integer_format": ","}) == (
+        convert_to_string,
+        format_numbers,
+    )
+    assert pipeline.plan(preprocessors, {"integer_format": ","}, (str, bool)) == (
+        convert_to_string,
+    )
+
+
+def test_needs_column_types():
+    """Test that only declared or unknown preprocessors need column types."""
+
+    def unknown(data, headers, **_):
+        return data, headers
+
+    assert not pipeline.needs_column_types((convert_to_string, style_output))
+    assert pipeline.needs_column_types((convert_to_string, align_decimals))
+    assert pipeline.needs_column_types((convert_to_string, unknown))
+
+
+def test_is_streaming():
+    """Test that full-scan and unknown preprocessors are not streaming."""
+    assert pipeline.is_streaming((convert_to_string, style_output))
+    assert not pipeline.is_streaming((convert_to_string, align_decimals))
+    assert not pipeline.is_streaming((lambda data, headers: (data, headers),))
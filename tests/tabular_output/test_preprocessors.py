@@ -2,6 +2,7 @@
 """Test CLI Helpers' tabular output preprocessors."""
 
 from __future__ import unicode_literals
+from datetime import date, datetime
 from decimal import Decimal
 import os
 
@@ -11,14 +12,17 @@ from cli_helpers.compat import HAS_PYGMENTS
 from cli_helpers.tabular_output.preprocessors import (
     align_decimals,
     bytes_to_string,
+    convert_to_display_string,
     convert_to_string,
     convert_to_undecoded_string,
+    escape_newlines,
     quote_whitespaces,
     override_missing_value,
     override_tab_value,
     style_output,
     format_numbers,
     format_timestamps,
+    wrap_string,
 )
 
 if HAS_PYGMENTS:
@@ -46,6 +50,16 @@ def test_convert_to_string():
     assert expected == (list(results[0]), results[1])
 
 
+def test_convert_to_display_string():
+    """Test that convert_to_display_string() previews long binary data."""
+    data = [[b"\xff" * 5000, 1]]
+    headers = [b"blob", "n"]
+    expected = ([["0x" + "ff" * 6, "1"]], ["blob", "n"])
+    results = convert_to_display_string(data, headers, max_field_width=10)
+
+    assert expected == (list(results[0]), results[1])
+
+
 def test_convert_to_undecoded_string():
     """Test the convert_to_undecoded_string() function."""
     data = [[1, "John"], [2, b"Jill"], [3, None]]
@@ -98,6 +112,26 @@ def test_override_tab_value():
     assert expected == (list(results[0]), results[1])
 
 
+def test_escape_newlines():
+    """Test the escape_newlines() function."""
+    data = [[1, "a\r\nb"], [2, "c"]]
+    headers = ["id", "name"]
+    expected = ([[1, "a\\r\\nb"], [2, "c"]], ["id", "name"])
+    results = escape_newlines(data, headers)
+
+    assert expected == (list(results[0]), results[1])
+
+
+def test_wrap_string():
+    """Test the wrap_string() function."""
+    data = [[1, "the quick brown fox"], [2, None]]
+    headers = ["id", "name"]
+    expected = ([[1, "the quick\nbrown fox"], [2, None]], ["id", "name"])
+    results = wrap_string(data, headers, max_col_width=10)
+
+    assert expected == (list(results[0]), results[1])
+
+
 def test_bytes_to_string():
     """Test the bytes_to_string() function."""
     data = [[1, "John"], [2, b"Jill"]]
@@ -141,6 +175,55 @@ def test_align_decimals_non_decimals():
     assert expected == (list(results[0]), results[1])
 
 
+def test_align_decimals_column_precisions():
+    """Test align_decimals() with declared precisions streams the data."""
+    data = iter([[Decimal("1.5"), 1.25], [Decimal("10.25"), 100.5]])
+    headers = ["num1", "num2"]
+    column_types = (float, float)
+    expected = [["   1.5", "  1.25"], ["  10.25", "100.5"]]
+    results = align_decimals(
+        data, headers, column_types=column_types, column_precisions=[(5, 2), None]
+    )
+
+    assert expected == list(results[0])
+
+
+def test_align_decimals_column_precisions_negative():
+    """Test that negative numbers fit in their declared precision."""
+    data = [[Decimal("1.5")], [Decimal("-999.99")], [Decimal("-0.25")]]
+    expected = [["   1.5"], ["-999.99"], ["  -0.25"]]
+    results = align_decimals(
+        data, ["num"], column_types=(float,), column_precisions=[(5, 2)]
+    )
+
+    assert expected == list(results[0])
+
+
+def test_align_decimals_unknown_precision():
+    """Test that columns with a None precision are scanned."""
+    data = [[Decimal("1.5"), Decimal("1.25")], [Decimal("10.25"), Decimal("-100.5")]]
+    headers = ["num1", "num2"]
+    expected = [[" 1.5", "   1.25"], ["10.25", "-100.5"]]
+    results = align_decimals(
+        data,
+        headers,
+        column_types=(float, float),
+        column_precisions=[(None, None), (None, 2)],
+    )
+
+    assert expected == list(results[0])
+
+
+def test_align_decimals_sample_size():
+    """Test align_decimals() scanning a sample with a wider value after it."""
+    data = [[Decimal("1.5")], [Decimal("10.25")], [Decimal("1000.5")], [Decimal("1")]]
+    headers = ["num1"]
+    expected = [[" 1.5"], ["10.25"], ["1000.5"], ["   1"]]
+    results = align_decimals(data, headers, column_types=(float,), sample_size=2)
+
+    assert expected == list(results[0])
+
+
 def test_quote_whitespaces():
     """Test the quote_whitespaces() function."""
     data = [["  before", "after  "], ["  both  ", "none"]]
@@ -171,6 +254,26 @@ def test_quote_whitespaces_non_spaces():
     assert expected == (list(results[0]), results[1])
 
 
+def test_quote_whitespaces_column_types():
+    """Test that quote_whitespaces() only checks text columns."""
+    data = iter([[1, " a"], [2, "b"]])
+    headers = ["h1", "h2"]
+    expected = [["1", "' a'"], ["2", "'b'"]]
+    results = quote_whitespaces(data, headers, column_types=(int, str))
+
+    assert expected == list(results[0])
+
+
+def test_quote_whitespaces_sample_size():
+    """Test that quote_whitespaces() only scans *sample_size* rows."""
+    data = iter([["a", " b"], ["c", "d"], [" e", "f"]])
+    headers = ["h1", "h2"]
+    expected = [["a", "' b'"], ["c", "'d'"], [" e", "'f'"]]
+    results = quote_whitespaces(data, headers, sample_size=2)
+
+    assert expected == list(results[0])
+
+
 @pytest.mark.skipif(not HAS_PYGMENTS, reason="requires the Pygments library")
 def test_style_output_no_styles():
     """Test that *style_output()* does not style without styles."""
@@ -307,6 +410,42 @@ def test_style_output_custom_tokens(TwoFiftySixColor):
     assert list(output[0]) in [expected_data_old, expected_data_new]
 
 
+@pytest.mark.skipif(not HAS_PYGMENTS, reason="requires the Pygments library")
+def test_style_output_line_mode(TwoFiftySixColor):
+    """Test that *style_output()* styles each single-line row once."""
+
+    class CliStyle(Style):
+        default_style = ""
+        styles = {
+            Token.Output.OddRow: "#f00",
+            Token.Output.EvenRow: "#0f0",
+            Token.Output.Null: "#00f",
+        }
+
+    headers = ["h1", "h2", "h3"]
+    data = [["1", "2", "3"], ["a", "\x1b[38;5;12mb\x1b[39m", "c\nd"]]
+
+    expected_data = [
+        ["\x1b[38;5;9m1", "2", "3\x1b[39m"],
+        [
+            "\x1b[38;5;10ma\x1b[39m",
+            "\x1b[38;5;10m\x1b[38;5;12mb\x1b[39m\x1b[39m",
+            "\x1b[38;5;10mc\x1b[39m\n\x1b[38;5;10md\x1b[39m",
+        ],
+    ]
+    results = style_output(data, headers, style=CliStyle, row_style_mode="line")
+
+    assert (expected_data, headers) == (list(results[0]), results[1])
+
+    data = [["a", "\x1b[38;5;12mb\x1b[39m", "c"]]
+    expected_data = [
+        ["\x1b[38;5;9ma", "\x1b[38;5;12mb\x1b[39m\x1b[38;5;9m", "c\x1b[39m"]
+    ]
+    results = style_output(data, headers, style=CliStyle, row_style_mode="line")
+
+    assert expected_data == list(results[0])
+
+
 def test_format_integer():
     """Test formatting for an INTEGER datatype."""
     data = [[1], [1000], [1000000]]
@@ -358,6 +497,25 @@ def test_format_integer_only():
     assert headers == result_headers
 
 
+def test_format_numbers_separators():
+    """Test formatting numbers with locale-style separators."""
+    data = [[1000, 1000.5, "1,000.5"], [None, 1.0, "a"]]
+    headers = ["h1", "h2", "h3"]
+    result_data, result_headers = format_numbers(
+        data,
+        headers,
+        column_types=(int, float, str),
+        integer_format=",",
+        float_format=",",
+        thousands_separator=".",
+        decimal_point=",",
+    )
+
+    expected = [["1.000", "1.000,5", "1,000.5"], [None, "1,0", "a"]]
+    assert expected == list(result_data)
+    assert headers == result_headers
+
+
 def test_format_numbers_no_format_strings():
     """Test that numbers aren't formatted without format strings."""
     data = ((1), (1000), (1000000))
@@ -419,3 +577,24 @@ def test_format_timestamps():
     ]
     assert expected == list(result_data)
     assert headers == result_headers
+
+
+def test_format_timestamps_native_values():
+    """Test that format_timestamps() formats datetime and date values."""
+    data = iter(
+        [
+            [datetime(2024, 12, 13, 18, 32, 22), date(2024, 12, 13), 1],
+            [None, "2025-02-13", 2],
+        ]
+    )
+    headers = ["datetime_col", "date_col", "id"]
+    column_date_formats = {
+        "datetime_col": "%H:%M",
+        "date_col": "%d.%m.%Y",
+        "missing_col": "%Y",
+    }
+    result_data, result_headers = format_timestamps(data, headers, column_date_formats)
+
+    expected = [["18:32", "13.12.2024", 1], [None, "13.02.2025", 2]]
+    assert expected == list(result_data)
+    assert headers == result_headers
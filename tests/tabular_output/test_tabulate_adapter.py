@@ -2,12 +2,15 @@
 """Test the tabulate output adapter."""
 
 from __future__ import unicode_literals
+from concurrent.futures import ThreadPoolExecutor
 from textwrap import dedent
 
 import pytest
+import tabulate
 
 from cli_helpers.compat import HAS_PYGMENTS
 from cli_helpers.tabular_output import tabulate_adapter
+from cli_helpers.tabular_output.preprocessors import style_output
 
 if HAS_PYGMENTS:
     from pygments.style import Style
@@ -105,10 +108,11 @@ def test_style_output_table():
 
     headers = ["h1", "h2"]
     data = [["观音", "2"], ["Ποσειδῶν", "b"]]
-    style_output_table = tabulate_adapter.style_output_table("psql")
+    psql = tabulate_adapter.tabulate._table_formats["psql"]
 
-    style_output_table(data, headers, style=CliStyle)
-    output = tabulate_adapter.adapter(iter(data), headers, table_format="psql")
+    output = tabulate_adapter.adapter(
+        iter(data), headers, table_format="psql", style=CliStyle
+    )
     PLUS = "\x1b[91m+\x1b[39m"
     MINUS = "\x1b[91m-\x1b[39m"
     PIPE = "\x1b[91m|\x1b[39m"
@@ -129,3 +133,348 @@ def test_style_output_table():
     )
 
     assert "\n".join(output) == expected
+    assert tabulate_adapter.tabulate._table_formats["psql"] is psql
+    assert tabulate_adapter.get_table_format("psql", CliStyle) is (
+        tabulate_adapter.get_table_format("psql", CliStyle)
+    )
+
+
+@pytest.mark.skipif(not HAS_PYGMENTS, reason="requires the Pygments library")
+def test_style_multiline_table_format():
+    """Test that styled multiline formats lay out multiline cells, and are
+    not left in tabulate's table formats."""
+
+    class CliStyle(Style):
+        default_style = ""
+        styles = {
+            Token.Output.TableSeparator: "ansibrightred",
+        }
+
+    table_formats = dict(tabulate._table_formats)
+    multiline_formats = dict(tabulate.multiline_formats)
+    output = tabulate_adapter.adapter(
+        [["a\nb", "c"]], ["h1", "h2"], table_format="pipe", style=CliStyle
+    )
+    PIPE = "\x1b[91m|\x1b[39m"
+
+    assert list(output)[2:] == [
+        PIPE + " a  " + PIPE + " c  " + PIPE,
+        PIPE + " b  " + PIPE + "    " + PIPE,
+    ]
+    assert tabulate._table_formats == table_formats
+    assert tabulate.multiline_formats == multiline_formats
+
+
+@pytest.mark.skipif(not HAS_PYGMENTS, reason="requires the Pygments library")
+def test_style_table_format_threads():
+    """Test that concurrent calls with different styles keep their styles."""
+
+    class RedStyle(Style):
+        default_style = ""
+        styles = {Token.Output.TableSeparator: "ansibrightred"}
+
+    class BlueStyle(Style):
+        default_style = ""
+        styles = {Token.Output.TableSeparator: "ansibrightblue"}
+
+    table_formats = dict(tabulate._table_formats)
+    tables = [[["a\nb", "c"]], [["a", "c"]]]
+    cases = [(style, data) for style in (RedStyle, BlueStyle) for data in tables]
+
+    def render(case):
+        style, data = case
+        return list(
+            tabulate_adapter.adapter(
+                data, ["h1", "h2"], table_format="simple", style=style
+            )
+        )
+
+    expected = list(map(render, cases))
+    assert len(expected[0]) == 4 and "\x1b[91m" in expected[0][1]
+    assert len(expected[2]) == 4 and "\x1b[94m" in expected[2][1]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        outputs = list(executor.map(render, 25 * cases))
+    assert outputs == 25 * expected
+    assert tabulate._table_formats == table_formats
+
+
+@pytest.mark.skipif(not HAS_PYGMENTS, reason="requires the Pygments library")
+def test_style_output_table_multiline():
+    """Test that styled tables still lay out multiline cells."""
+
+    class CliStyle(Style):
+        default_style = ""
+        styles = {
+            Token.Output.TableSeparator: "ansibrightred",
+        }
+
+    output = tabulate_adapter.adapter(
+        iter([["a\nb"]]), ["h1"], table_format="psql", style=CliStyle
+    )
+    PIPE = "\x1b[91m|\x1b[39m"
+
+    assert list(output)[3:5] == [PIPE + " a  " + PIPE, PIPE + " b  " + PIPE]
+    assert "\n".join(
+        tabulate_adapter.adapter(iter([["a"]]), ["h1"], table_format="psql")
+    ) == dedent(
+        """\
+        +----+
+        | h1 |
+        |----|
+        | a  |
+        +----+"""
+    )
+
+
+@pytest.mark.parametrize("table_format", tabulate_adapter.streaming_table_formats)
+def test_streaming_table_formats_match_tabulate(table_format):
+    """Test that the box formats are rendered line by line like tabulate."""
+    data = [
+        ["abc", 1, 1.5, "观音"],
+        ["d", -456, "12.125", None],
+        ["  padded ", 7, 0.25, "Ποσειδῶν"],
+    ]
+    headers = ["letters", "number", "float", "wide"]
+    tkwargs = {"tablefmt": table_format, "preserve_whitespace": False}
+    tkwargs.update(tabulate_adapter.default_kwargs.get(table_format, {}))
+
+    output = tabulate_adapter.adapter(iter(data), headers, table_format=table_format)
+    assert not isinstance(output, list)
+    assert "\n".join(output) == tabulate_adapter.tabulate.tabulate(
+        data, headers, **tkwargs
+    )
+
+
+def test_streaming_table_multiline_cells():
+    """Test that multiline cells are laid out on several lines."""
+    data = [["abc\ndef", 1]]
+    headers = ["letters", "number"]
+    output = tabulate_adapter.adapter(iter(data), headers, table_format="ascii")
+    assert "\n".join(output) == dedent(
+        """\
+        +---------+--------+
+        | letters | number |
+        +---------+--------+
+        | abc     | 1      |
+        | def     |        |
+        +---------+--------+"""
+    )
+
+
+def test_fixed_column_widths_from_sample():
+    """Test that rows after the sample are truncated to the sampled widths."""
+
+    def rows():
+        yield ["abc", "1"]
+        yield ["d", "22"]
+        yield ["a long value", "333"]
+        raise AssertionError("rows were read before they were rendered")
+
+    output = tabulate_adapter.adapter(
+        rows(), ["letters", "n"], table_format="psql", sample_size=2
+    )
+    assert [next(output) for _ in range(6)] == [
+        "+---------+-----+",
+        "| letters |   n |",
+        "|---------+-----|",
+        "| abc     |   1 |",
+        "| d       |  22 |",
+        "| a lo... | 333 |",
+    ]
+
+
+def test_fixed_column_widths():
+    """Test that given column widths are used, and newlines are escaped."""
+    data = [["a\nb", 1], ["long text", 22]]
+    output = tabulate_adapter.adapter(
+        iter(data), ["text", "n"], table_format="psql", column_widths=[6, None]
+    )
+    assert "\n".join(output) == dedent(
+        """\
+        +--------+-----+
+        | text   |   n |
+        |--------+-----|
+        | a\\nb   |   1 |
+        | lon... |  22 |
+        +--------+-----+"""
+    )
+
+
+def test_fixed_column_widths_narrow_header():
+    """Test that headers wider than their fixed column are truncated."""
+    data = [["abc", 1]]
+    output = tabulate_adapter.adapter(
+        iter(data), ["letters", "n"], table_format="psql", column_widths=[5, None]
+    )
+    assert "\n".join(output) == dedent(
+        """\
+        +-------+-----+
+        | le... |   n |
+        |-------+-----|
+        | abc   |   1 |
+        +-------+-----+"""
+    )
+
+
+def test_fixed_column_widths_number_overflow():
+    """Test that numbers wider than their fixed column are not truncated."""
+    data = [["abc", 1.5], ["def", 12345.25]]
+    output = tabulate_adapter.adapter(
+        iter(data), ["text", "n"], table_format="psql", column_widths=[None, 3]
+    )
+    assert "\n".join(output) == dedent(
+        """\
+        +------+-----+
+        | text |   n |
+        |------+-----|
+        | abc  | 1.5 |
+        | def  | ### |
+        +------+-----+"""
+    )
+
+
+@pytest.mark.skipif(not HAS_PYGMENTS, reason="requires the Pygments library")
+def test_fixed_column_widths_styled_overflow():
+    """Test that truncated cells keep the escape sequences of a row style."""
+
+    class CliStyle(Style):
+        default_style = ""
+        styles = {
+            Token.Output.OddRow: "bold",
+        }
+
+    data, headers = style_output(
+        [["a long value", "xyz1234567"]],
+        ["letters", "n"],
+        style=CliStyle,
+        row_style_mode="line",
+    )
+    output = tabulate_adapter.adapter(
+        data, headers, table_format="psql", column_widths=[6, 5]
+    )
+    assert list(output)[3] == "| \x1b[01ma l... | xy...\x1b[00m |"
+
+    data, headers = style_output(
+        [["a", "12345"]], ["letters", "n"], style=CliStyle, row_style_mode="line"
+    )
+    output = tabulate_adapter.adapter(
+        data, headers, table_format="psql", column_widths=[6, 3]
+    )
+    assert list(output)[3] == "| \x1b[01ma      | ###\x1b[00m |"
+
+
+def test_windowed_layout():
+    """Test that the header is repeated when a window changes the layout."""
+    data = [["a", 1], ["b", 2], ["c", 3], ["d", 4], ["e", 500]]
+    output = tabulate_adapter.adapter(
+        iter(data), ["letter", "n"], table_format="psql", window_size=2
+    )
+    assert "\n".join(output) == dedent(
+        """\
+        +--------+---+
+        | letter | n |
+        |--------+---|
+        | a      | 1 |
+        | b      | 2 |
+        | c      | 3 |
+        | d      | 4 |
+        +--------+---+
+        +--------+-----+
+        | letter |   n |
+        |--------+-----|
+        | e      | 500 |
+        +--------+-----+"""
+    )
+
+
+def test_multiline_cells_match_tabulate():
+    """Test that multiline cells are rendered line by line like tabulate."""
+    data = [["a\nbb\nccc", 1, "观\n音"], ["", 22, "Ποσειδῶν"]]
+    headers = ["letters", "number", "wide"]
+    output = tabulate_adapter.adapter(iter(data), headers, table_format="grid")
+    assert not isinstance(output, list)
+    assert "\n".join(output) == tabulate_adapter.tabulate.tabulate(
+        data, headers, tablefmt="grid"
+    )
+
+
+def test_max_cell_lines():
+    """Test that the lines of a cell beyond max_cell_lines are replaced."""
+    data = [["a\nb\nc\nd", 1], ["x", 2]]
+    output = tabulate_adapter.adapter(
+        iter(data), ["text", "n"], table_format="psql", max_cell_lines=2
+    )
+    assert "\n".join(output) == dedent(
+        """\
+        +------------+---+
+        | text       | n |
+        |------------+---|
+        | a          | 1 |
+        | b          |   |
+        | [+2 lines] |   |
+        | x          | 2 |
+        +------------+---+"""
+    )
+
+
+def test_long_multiline_cells_not_cached():
+    """Test that the lines of long multiline cells are not cached."""
+    aligned_table = tabulate_adapter.aligned_table
+    aligned_table._cached_split_lines.cache_clear()
+    data = [["a\n" + "b" * 1000, 1], ["c\nd", 2]]
+    output = tabulate_adapter.adapter(iter(data), ["text", "n"], table_format="psql")
+    assert len(list(output)) == 8
+    assert aligned_table._cached_split_lines.cache_info().currsize == 1
+
+
+@pytest.mark.parametrize(
+    "table_format", tabulate_adapter.markup_table.supported_formats
+)
+def test_markup_formats_match_tabulate(table_format):
+    """Test that the markup formats are rendered row by row like tabulate."""
+    data = [["<a & b>", 1, 2.5], ["x_y $5 {z}", 22, None], ["'q'", 3, 0.125]]
+    headers = ["text", "number", "float"]
+    output = tabulate_adapter.adapter(iter(data), headers, table_format=table_format)
+    assert not isinstance(output, list)
+    assert "\n".join(output) == tabulate_adapter.tabulate.tabulate(
+        data, headers, tablefmt=table_format, numalign=None, stralign=None
+    )
+
+
+def test_markup_format_streams_rows():
+    """Test that the markup formats read the rows after the sample lazily."""
+
+    def rows():
+        yield ["a", 1]
+        yield ["b", 2]
+        raise AssertionError("read past the second row")
+
+    output = tabulate_adapter.adapter(
+        rows(), ["text", "n"], table_format="html", sample_size=1
+    )
+    assert [next(output) for _ in range(6)] == [
+        "<table>",
+        "<thead>",
+        "<tr><th>text</th><th>n</th></tr>",
+        "</thead>",
+        "<tbody>",
+        "<tr><td>a</td><td>1</td></tr>",
+    ]
+    assert next(output) == "<tr><td>b</td><td>2</td></tr>"
+
+
+def test_tabulate_wrapper_threads():
+    """Test that concurrent calls leave tabulate's measure of wide characters
+    alone."""
+    wcwidth = tabulate.wcwidth
+    expected = ["====  =", "a     b", "====  =", "观音  1", "====  ="]
+
+    def render(_):
+        return list(
+            tabulate_adapter.adapter([["观音", 1]], ["a", "b"], table_format="rst")
+        )
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        outputs = list(executor.map(render, range(40)))
+    assert outputs == 40 * [expected]
+    assert tabulate.wcwidth is wcwidth
@@ -47,3 +47,22 @@ def test_unicode_with_tsv():
         观音\t1\n\
         Ποσειδῶν\t456"""
     )
+
+
+def test_tsv_converts_fields():
+    """Test that missing values, binary data and numbers are converted."""
+    data = [[1, None, b"\x01", "a\tb"], [2.5, "c", b"d", None]]
+    headers = ["number", "text", "binary", "tabbed"]
+    output = tsv_output_adapter.adapter(
+        iter(data), headers, missing_value="NULL", table_format="tsv_noheader"
+    )
+    assert list(output) == ["1\tNULL\t0x01\ta\\tb", "2.5\tc\td\tNULL"]
+
+
+def test_tsv_text_columns():
+    """Test rows of text columns, with and without special characters."""
+    data = [["a", "b"], ["c\nd", None], ["e", "f"]]
+    output = tsv_output_adapter.adapter(
+        iter(data), ["x", "y"], column_types=[str, str], table_format="tsv_noheader"
+    )
+    assert list(output) == ["a\tb", "c\\nd\t", "e\tf"]
@@ -47,3 +47,20 @@ def test_vertical_table_customized():
             sep_length=(1, 5),
         )
     )
+
+
+def test_vertical_table_streams_records():
+    """Test that vertical_table() formats one record at a time."""
+
+    def results():
+        yield ("john", text_type(47))
+        raise AssertionError("read past the first record")
+
+    output = vertical_table_adapter.adapter(
+        results(),
+        ("name", "age"),
+        sep_title="{n:>3}",
+        sep_character="{",
+        sep_length=(1, 2),
+    )
+    assert next(output) == "{[   1 ]{{\nname | john\nage  | 47"
@@ -3,7 +3,14 @@
 
 from __future__ import unicode_literals
 
+import pytest
+
 from cli_helpers import utils
+from cli_helpers.compat import HAS_PYGMENTS, StringIO
+
+if HAS_PYGMENTS:
+    from pygments.style import Style
+    from pygments.token import Token
 
 
 def test_bytes_to_string_hexlify():
@@ -29,6 +36,23 @@ def test_bytes_to_string_non_bytes():
     assert utils.bytes_to_string(1) == 1
 
 
+def test_bytes_to_string_preview():
+    """Test that bytes_to_string() previews long values with *max_width*."""
+    blob = b"\xff" * 5000000
+    preview = utils.bytes_to_string(blob, max_width=10)
+    assert preview == "0x" + "ff" * 6
+    assert utils.truncate_string(preview, 10) == utils.truncate_string(
+        utils.bytes_to_string(blob), 10
+    )
+
+    text = "观音".encode("utf8") * 100
+    assert utils.truncate_string(
+        utils.bytes_to_string(text, max_width=10), 10
+    ) == utils.truncate_string(utils.bytes_to_string(text), 10)
+
+    assert utils.bytes_to_string(b"a\0" * 100, max_width=10) == "0x" + "6100" * 3
+
+
 def test_to_string_bytes():
     """Test that to_string() converts bytes to a string."""
     assert utils.to_string(b"foo") == "foo"
@@ -57,6 +81,46 @@ def test_truncate_string():
     assert utils.truncate_string(str_val, 10, skip_multiline_string=True) == str_val
 
 
+def test_truncate_string_wide_characters():
+    """Test that truncate_string() truncates to the display width."""
+    val = "观音" * 10
+    assert utils.truncate_string(val, 10) == "观音观..."
+    assert utils.truncate_string("观音", 4) == "观音"
+    assert utils.truncate_string("Ποσειδῶν", 8) == "Ποσειδῶν"
+
+
+def test_wrap_string():
+    """Test that wrap_string() wraps at whitespace and splits long words."""
+    assert utils.wrap_string("the quick brown fox", 10) == "the quick\nbrown fox"
+    assert utils.wrap_string("abcdefgh", 3) == "abc\ndef\ngh"
+    assert utils.wrap_string("观音观音 ab", 4) == "观音\n观音\nab"
+    assert utils.wrap_string("a\nbb cc", 2) == "a\nbb\ncc"
+    assert utils.wrap_string("short", 10) == "short"
+    assert utils.wrap_string(1, 10) == 1
+
+
+def test_wrap_string_long_string():
+    """Test that wrap_string() does not cache long strings."""
+    utils._cached_wrap_string.cache_clear()
+    assert utils.wrap_string("abc " * 100, 8).split("\n")[0] == "abc abc"
+    assert utils._cached_wrap_string.cache_info().currsize == 0
+
+
+def test_display_width():
+    """Test that display_width() counts terminal columns."""
+    assert utils.display_width("abc") == 3
+    assert utils.display_width("观音") == 4
+    assert utils.display_width("\x1b[38;5;10m观音\x1b[39m") == 4
+    assert utils.display_width("\x1b[38;5;10mabc\x1b[39m") == 3
+
+
+def test_display_width_long_string():
+    """Test that display_width() does not cache the widths of long strings."""
+    utils._cached_display_width.cache_clear()
+    assert utils.display_width("观音" * 1000) == 4000
+    assert utils._cached_display_width.cache_info().currsize == 0
+
+
 def test_intlen_with_decimal():
     """Test that intlen() counts correctly with a decimal place."""
     assert utils.intlen("11.1") == 2
@@ -100,3 +164,80 @@ def test_version_as_tuple_04():
 def test_version_as_tuple_05():
     """Test version_as_tuple() deleting post1 elements."""
     assert utils.version_as_tuple('0.10.0.post1') == (0, 10, 0)
+
+
+@pytest.mark.skipif(not HAS_PYGMENTS, reason="requires the Pygments library")
+def test_style_field_matches_pygments():
+    """Test that style_field() matches Pygments' terminal formatter output."""
+
+    class CliStyle(Style):
+        default_style = ""
+        styles = {Token.Output.OddRow: "bg:#eee #111"}
+
+    formatter = utils._get_formatter(CliStyle, utils.is_truecolor())
+    for field in ("abc", "", "a\nb", "\na\n\nb\n", "a\rb"):
+        expected = StringIO()
+        formatter.format(((Token.Output.OddRow, field),), expected)
+        assert utils.style_field(Token.Output.OddRow, field, CliStyle) == (
+            expected.getvalue()
+        )
+
+
+@pytest.mark.skipif(not HAS_PYGMENTS, reason="requires the Pygments library")
+def test_get_style_codes_unstyled_token():
+    """Test that get_style_codes() returns empty codes for unstyled tokens."""
+
+    class CliStyle(Style):
+        default_style = ""
+        styles = {Token.Output.OddRow: "#0f0"}
+
+    assert utils.get_style_codes(Token.Output.Header, CliStyle) == ("", "")
+    assert utils.style_field(Token.Output.Header, "abc", CliStyle) == "abc"
+
+
+def test_apply_row_style_codes():
+    """Test that apply_row_style_codes() re-opens the row style after fields
+    with styles of their own."""
+    on, off = "\x1b[7m", "\x1b[0m"
+    null = "\x1b[91m<null>\x1b[39m"
+    assert utils.apply_row_style_codes(["a", null, "b"], on, off) == [
+        on + "a",
+        null + on,
+        "b" + off,
+    ]
+    assert utils.apply_row_style_codes(["a", null, "b"], on, off, reopen=True) == [
+        on + "a",
+        on + null + on,
+        on + "b" + off,
+    ]
+
+
+def test_merge_style_codes():
+    """Test that merge_style_codes() merges adjacent runs of the same style."""
+    on, off = "\x1b[91m", "\x1b[39m"
+    styled = on + "+" + off + on + "-" + off + " " + on + "|" + off
+    assert utils.merge_style_codes(styled, on, off) == (
+        on + "+-" + off + " " + on + "|" + off
+    )
+    assert utils.merge_style_codes(styled, "", "") == styled
+
+
+def test_merge_style_codes_other_style():
+    """Test that merge_style_codes() keeps the codes after runs of another
+    style with the same suffix."""
+    on, off = "\x1b[38;5;21m", "\x1b[39m"
+    null = "\x1b[38;5;9m<null>" + off
+    styled = on + "|" + off + " " + null + on + " |" + off + on + "-" + off
+    assert utils.merge_style_codes(styled, on, off) == (
+        on + "|" + off + " " + null + on + " |-" + off
+    )
+
+
+def test_get_escaper():
+    """Test that get_escaper() applies fused replacements."""
+    escape = utils.get_escaper(utils.NEWLINE_ESCAPES + (("\t", "  "),))
+    assert escape("a\r\nb\tc") == "a\\r\\nb  c"
+    assert escape("abc") == "abc"
+    assert utils.get_escaper(utils.TSV_ESCAPES) is utils.get_escaper(
+        utils.TSV_ESCAPES
+    )